@@ -1,15 +1,289 @@
+import asyncio
+import gzip
+import json
 import logging
+import time
+from codecs import iterdecode
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
 from functools import lru_cache
+from hashlib import sha256
+from importlib import import_module
+from itertools import chain
+from os import environ, getpid, makedirs, replace
+from os.path import join
+from random import uniform
+from sys import intern
+from threading import Lock, Thread
+from typing import Callable, NamedTuple, Optional, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from octodns.record import Record
 from octodns.source.base import BaseSource
-from octodns.zone import SubzoneRecordException, Zone
+from octodns.zone import Zone
 
 __version__ = __VERSION__ = '1.0.0'
 
 
+class _Challenge(NamedTuple):
+    """
+    The parts of a TLS authorization's challenge that are used.
+
+    Challenges are normalized into these as soon as they're received so that
+    none of the raw JSON is held onto.
+    """
+
+    type: str
+    record_name: str
+    value: str
+
+    @classmethod
+    def parse(cls, authorization):
+        """
+        Yield the challenges of a TLS authorization.
+        """
+        for challenge in authorization["attributes"]["challenges"]:
+            values = challenge["values"]
+            yield cls(
+                intern(challenge["type"]),
+                intern(challenge["record_name"]),
+                intern(values[0] if values else ""),
+            )
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    An `HTTPAdapter` that applies a default timeout to every request.
+    """
+
+    def __init__(self, timeout, *args, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class _SharedCache:
+    """
+    A thread-safe, size bounded, least recently used cache.
+
+    When a value is missing the first caller loads it, concurrent callers
+    asking for the same key wait for and share the result of that single
+    in-flight load. Failed loads aren't cached. Callers can pass a `max_age`,
+    in seconds, past which a loaded value is treated as missing and loaded
+    again.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = Lock()
+        # key -> (future, monotonic time its load started)
+        self._futures = OrderedDict()
+
+    def get(self, key, load, max_age: Optional[float] = None):
+        with self._lock:
+            entry = self._futures.get(key)
+            loading = entry is None or (
+                max_age is not None
+                and entry[0].done()
+                and time.monotonic() - entry[1] >= max_age
+            )
+            if loading:
+                future = Future()
+                self._futures[key] = (future, time.monotonic())
+                self._futures.move_to_end(key)
+                while len(self._futures) > self.maxsize:
+                    self._futures.popitem(last=False)
+            else:
+                future = entry[0]
+                self._futures.move_to_end(key)
+
+        if loading:
+            try:
+                future.set_result(load())
+            except BaseException as e:
+                with self._lock:
+                    entry = self._futures.get(key)
+                    if entry is not None and entry[0] is future:
+                        del self._futures[key]
+                future.set_exception(e)
+                raise
+
+        return future.result()
+
+    def clear(self):
+        with self._lock:
+            self._futures.clear()
+
+
+class _Metrics:
+    """
+    Thread-safe totals of the timings and values measured by a source.
+
+    Each measurement is also passed to `hook`, when there is one, as
+    `hook(name, value, tags)` so that it can be exported, e.g. to statsd.
+    """
+
+    def __init__(self, hook=None, tags=None):
+        self._hook = hook
+        self._tags = tags or {}
+        self._lock = Lock()
+        self._counts = defaultdict(int)
+        self._totals = defaultdict(float)
+        self._timings = set()
+
+    def record(self, name: str, value: float = 1, **tags):
+        with self._lock:
+            self._counts[name] += 1
+            self._totals[name] += value
+        if self._hook is not None:
+            self._hook(name, value, {**self._tags, **tags})
+
+    def timing(self, name: str, seconds: float, **tags):
+        with self._lock:
+            self._timings.add(name)
+        self.record(name, seconds, **tags)
+
+    @contextmanager
+    def timer(self, name: str, **tags):
+        start = time.perf_counter()
+        yield
+        self.timing(name, time.perf_counter() - start, **tags)
+
+    def summary(self):
+        """
+        Describe the totals, e.g. `page.request 3 in 0.412s, page.bytes 5120`.
+        """
+        with self._lock:
+            return ", ".join(
+                (
+                    f"{name} {self._counts[name]} in {self._totals[name]:.3f}s"
+                    if name in self._timings
+                    else f"{name} {self._totals[name]:g}"
+                )
+                for name in sorted(self._counts)
+            )
+
+
+def _changed_zones(previous, current):
+    # Including zones that are only in one or the other
+    return sorted(
+        zone_name
+        for zone_name in current.keys() | previous.keys()
+        if current.get(zone_name) != previous.get(zone_name)
+    )
+
+
+def _load_hook(path: str):
+    # A `module.callable` path, as hooks can't be given directly in YAML
+    module, _, name = path.rpartition(".")
+    return getattr(import_module(module), name)
+
+
+# The challenges of each Fastly account, shared by every source in the process
+_shared_cache = _SharedCache(maxsize=32)
+
+
+def _cached_page(cached_pages, number: int):
+    # Pages are numbered from 1, there may be more than were cached
+    return cached_pages[number - 1] if number <= len(cached_pages) else None
+
+
+def _iter_page_members(page):
+    # Mirror `_iter_json_object` streaming `data` and `included`
+    for key, value in page.items():
+        if key in ("data", "included"):
+            for item in value:
+                yield key, item
+        else:
+            yield key, value
+
+
+def _iter_json_object(chunks, streamed=()):
+    """
+    Incrementally decode the members of the JSON object made up of `chunks`.
+
+    Yields `(key, value)` for each member of the object. Members named in
+    `streamed` must be arrays, `(key, item)` is yielded for each of their items
+    so that the array as a whole is never held in memory. Only the part of the
+    text that has not been decoded yet is buffered.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+
+    def read():
+        nonlocal buf, pos
+        for chunk in chunks:
+            if chunk:
+                buf = buf[pos:] + chunk
+                pos = 0
+                return True
+        return False
+
+    def peek():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\n\r":
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not read():
+                raise ValueError("Unexpected end of JSON")
+
+    def take(expected):
+        nonlocal pos
+        char = peek()
+        if char not in expected:
+            raise ValueError(f"Expecting one of {expected!r}, found {char!r}")
+        pos += 1
+        return char
+
+    def decode():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not read():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(buf) and read():
+                continue
+            pos = end
+            return value
+
+    take("{")
+    if peek() == "}":
+        return
+    while True:
+        key = decode()
+        take(":")
+        if key in streamed:
+            take("[")
+            if peek() == "]":
+                take("]")
+            else:
+                while True:
+                    yield key, decode()
+                    if take(",]") == "]":
+                        break
+        else:
+            yield key, decode()
+        if take(",}") == "}":
+            return
+
+
 class FastlyAcmeSource(BaseSource):
     """
     An OctoDNS source for Fastly ACME DNS challenges.
@@ -38,125 +312,1470 @@ class FastlyAcmeSource(BaseSource):
     SUPPORTS_GEO = False
     SUPPORTS_DYNAMIC = False
     SUPPORTS = set(("CNAME"))
+    # Whether the source fetches with a token of its own
+    REQUIRES_TOKEN = True
 
     DEFAULT_TTL = 3600
+    DEFAULT_MAX_WORKERS = 4
+    DEFAULT_CACHE_TTL = 300
+    DEFAULT_MAX_RETRIES = 5
+    DEFAULT_RETRY_BACKOFF = 1.0
+    DEFAULT_RETRY_MAX_BACKOFF = 60.0
+    DEFAULT_CONNECT_TIMEOUT = 10.0
+    DEFAULT_READ_TIMEOUT = 60.0
+    # Matches requests' default, raised to `max_workers` when that's larger
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_FULL_REFRESH_INTERVAL = 86400
+    DEFAULT_WATCH_INTERVAL = 60.0
+
+    # Responses that are worth retrying, rate limited or a server side error
+    RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+    # Size of the chunks read from the response body when streaming
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    TLS_SUBSCRIPTIONS_URL = "https://api.fastly.com/tls/subscriptions"
+    TLS_DOMAINS_URL = "https://api.fastly.com/tls/domains"
+    ENDPOINTS = ("subscriptions", "domains")
+    DECODERS = ("json", "msgspec", "auto")
+
+    # Bump whenever the layout of the on-disk cache changes
+    CACHE_VERSION = 4
+    # Bump whenever the layout of snapshots changes
+    SNAPSHOT_VERSION = 1
+    # Bump whenever the layout of fingerprints files, or how they're
+    # computed, changes
+    FINGERPRINTS_VERSION = 1
 
-    def __init__(self, id: str, token: str, default_ttl: int = DEFAULT_TTL):
+    def __init__(
+        self,
+        id: str,
+        token: Optional[str] = None,
+        default_ttl: int = DEFAULT_TTL,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        cache_dir: Optional[str] = None,
+        cache_ttl: int = DEFAULT_CACHE_TTL,
+        zone_filter_threshold: int = 0,
+        page_size: Optional[int] = None,
+        sparse_fieldsets: bool = False,
+        stream: bool = False,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        retry_max_backoff: float = DEFAULT_RETRY_MAX_BACKOFF,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        pool_size: Optional[int] = None,
+        keep_alive: bool = True,
+        compress: bool = True,
+        incremental: bool = False,
+        full_refresh_interval: int = DEFAULT_FULL_REFRESH_INTERVAL,
+        subscription_states: Optional[list] = None,
+        metrics: Optional[Union[str, Callable]] = None,
+        prefetch: bool = False,
+        snapshot: Optional[str] = None,
+        zones: Optional[list] = None,
+        endpoint: str = "subscriptions",
+        decoder: str = "json",
+    ):
         klass = self.__class__.__name__
         self.log = logging.getLogger(f"{klass}[{id}]")
-        self.log.debug("__init__: id=%s, default_ttl=%d", id, default_ttl)
+        self.log.debug(
+            "__init__: id=%s, default_ttl=%d, max_workers=%d, cache_dir=%s, cache_ttl=%d, zone_filter_threshold=%d, page_size=%s, sparse_fieldsets=%s, stream=%s, max_retries=%d, retry_backoff=%f, retry_max_backoff=%f, connect_timeout=%f, read_timeout=%f, pool_size=%s, keep_alive=%s, compress=%s, incremental=%s, full_refresh_interval=%d, subscription_states=%s, metrics=%s, prefetch=%s, snapshot=%s, zones=%s, endpoint=%s, decoder=%s",
+            id,
+            default_ttl,
+            max_workers,
+            cache_dir,
+            cache_ttl,
+            zone_filter_threshold,
+            page_size,
+            sparse_fieldsets,
+            stream,
+            max_retries,
+            retry_backoff,
+            retry_max_backoff,
+            connect_timeout,
+            read_timeout,
+            pool_size,
+            keep_alive,
+            compress,
+            incremental,
+            full_refresh_interval,
+            subscription_states,
+            metrics,
+            prefetch,
+            snapshot,
+            zones,
+            endpoint,
+            decoder,
+        )
 
         super().__init__(id)
 
+        if self.REQUIRES_TOKEN and token is None and snapshot is None:
+            raise ValueError(f"{klass} requires a token or a snapshot")
+        if endpoint not in self.ENDPOINTS:
+            raise ValueError(
+                f"Unknown endpoint {endpoint}, expected one of {', '.join(self.ENDPOINTS)}"
+            )
+        if endpoint == "domains" and (
+            subscription_states is not None
+            or incremental
+            or zone_filter_threshold
+        ):
+            raise ValueError(
+                "subscription_states, incremental and zone_filter_threshold require the subscriptions endpoint"
+            )
+        if incremental and cache_dir is None:
+            raise ValueError("incremental requires cache_dir")
+
+        if decoder not in self.DECODERS:
+            raise ValueError(
+                f"Unknown decoder {decoder}, expected one of {', '.join(self.DECODERS)}"
+            )
+
+        if zone_filter_threshold and cache_dir is None:
+            raise ValueError("zone_filter_threshold requires cache_dir")
+
         self._ttl = default_ttl
+        self._endpoint = endpoint
+        # Pages are decoded straight into typed structs with msgspec when
+        # it's asked for, or with auto when it's installed
+        self._decode_page = None
+        if decoder != "json":
+            try:
+                from octodns_fastly._typed import decode_page
+            except ImportError:
+                if decoder == "msgspec":
+                    raise ImportError(
+                        "decoder msgspec requires msgspec, install octodns-fastly[fast]"
+                    )
+            else:
+                self._decode_page = decode_page
         self._token = token
+        self._max_workers = max_workers
+        self._cache_dir = cache_dir
+        self._cache_ttl = cache_ttl
+        self._snapshot = snapshot
+        self._polled_pages = []
+        # The only zones that will be populated, challenges outside of them
+        # are discarded as soon as they're received
+        self._zones = (
+            None
+            if zones is None
+            else frozenset(
+                zone if zone.endswith(".") else f"{zone}." for zone in zones
+            )
+        )
+        self._stream = stream
+        self._incremental = incremental
+        self._full_refresh_interval = full_refresh_interval
+        self._subscription_states = (
+            None
+            if subscription_states is None
+            else frozenset(subscription_states)
+        )
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self._retry_max_backoff = retry_max_backoff
+        self._zone_filter_threshold = zone_filter_threshold
+        self._filtered_zones = set()
+        self._filtered_zones_lock = Lock()
+        # Set once the full listing has been indexed, see `_zone_domains`
+        self._indexed_all = False
+        if isinstance(metrics, str):
+            metrics = _load_hook(metrics)
+        self._metrics = _Metrics(metrics, {"source": id})
+
+        # Parameters sent with every request to list TLS subscriptions, or
+        # domains, both of which include their authorizations
+        self._params = {"include": "tls_authorizations"}
+        if page_size is not None:
+            self._params["page[size]"] = page_size
+        if sparse_fieldsets:
+            # Only ask for the attributes that are actually used
+            if endpoint == "domains":
+                self._params["fields[tls_domain]"] = "tls_authorizations"
+            else:
+                self._params["fields[tls_subscription]"] = (
+                    "tls_authorizations"
+                    if subscription_states is None
+                    else "state,tls_authorizations"
+                )
+            self._params["fields[tls_authorization]"] = "challenges"
+        if incremental:
+            # New subscriptions are added to the end of the listing
+            self._params["sort"] = "created_at"
+
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        if pool_size is None:
+            pool_size = max(max_workers, self.DEFAULT_POOL_SIZE)
+        self._pool_size = pool_size
+        # Headers sent with every request, on top of the client's defaults
+        self._headers = {"Accept-Encoding": "gzip" if compress else "identity"}
+        if not keep_alive:
+            self._headers["Connection"] = "close"
+
         self._session = requests.Session()
+        self._session.headers.update(self._headers)
+        self._session.mount(
+            "https://",
+            _TimeoutHTTPAdapter(
+                (connect_timeout, read_timeout),
+                pool_connections=1,
+                pool_maxsize=pool_size,
+            ),
+        )
 
-    @lru_cache(maxsize=None)
-    def _list_tls_authorizations(self):
+        if prefetch:
+            self._start_prefetch()
+
+    def prefetch(self):
         """
-        Fetch TLS subscriptions and return a list of TLS authorizations.
+        Fetch and index the challenges of every subscription now rather than
+        when the first zone is populated.
 
-        This method uses `@cache` to avoid making multiple requests to the Fastly API
-        on every call to populate a zone when the responses will be the same per Fastly account.
+        The listing is shared, so a `populate` that starts while this is still
+        running waits for it rather than fetching again.
         """
-        page = 1
-        authorizations = []
+        self._challenge_index()
+
+    def _start_prefetch(self):
+        """
+        Run `prefetch` in a background thread.
+
+        Failures are logged and otherwise ignored, `populate` will fetch
+        again and raise the error.
+        """
+
+        def run():
+            try:
+                self.prefetch()
+            except Exception:
+                self.log.warning(
+                    "_start_prefetch: prefetch failed", exc_info=True
+                )
+
+        self._prefetch_thread = Thread(
+            target=run, name=f"{self.id}-prefetch", daemon=True
+        )
+        self._prefetch_thread.start()
+
+    def _cache_key(self):
+        # Everything other than the token that changes the challenges listed
+        return json.dumps(
+            [
+                self._endpoint,
+                self._params,
+                (
+                    None
+                    if self._subscription_states is None
+                    else sorted(self._subscription_states)
+                ),
+                None if self._zones is None else sorted(self._zones),
+            ],
+            sort_keys=True,
+        )
+
+    def _cache_path(self):
+        # Key the cache on a digest of the token so that it never hits the
+        # disk, along with the parameters as they change the pages returned
+        digest = sha256(
+            json.dumps([self._token, self._cache_key()]).encode()
+        ).hexdigest()
+        return join(self._cache_dir, f"{digest}.json")
+
+    def _read_cache(self):
+        """
+        Read the cached TLS subscription pages from `cache_dir`.
+
+        Returns `None` when caching is disabled or there's no usable cache.
+        """
+        if self._cache_dir is None:
+            return None
+
+        path = self._cache_path()
+        try:
+            with open(path) as fh:
+                cache = json.load(fh)
+        except FileNotFoundError:
+            self.log.debug("_read_cache: no cache at %s", path)
+            return None
+        except ValueError:
+            self.log.warning("_read_cache: ignoring unreadable cache %s", path)
+            return None
+
+        if cache.get("version") != self.CACHE_VERSION:
+            self.log.debug("_read_cache: ignoring outdated cache %s", path)
+            return None
+
+        for page in cache["pages"]:
+            page["challenges"] = [
+                _Challenge(*map(intern, challenge))
+                for challenge in page["challenges"]
+            ]
+
+        return cache
+
+    def _write_cache(self, pages):
+        """
+        Write the TLS subscription pages to `cache_dir`.
+
+        Each page's challenges are kept along with its `ETag` so that it can
+        be revalidated once the cache is stale.
+        """
+        if self._cache_dir is None:
+            return
+
+        cache = {
+            "version": self.CACHE_VERSION,
+            "fetched_at": time.time(),
+            "pages": [
+                {
+                    "etag": page["etag"],
+                    "total_pages": page["total_pages"],
+                    # Challenges are tuples and so written as lists
+                    "challenges": page["challenges"],
+                }
+                for page in pages
+            ],
+        }
+
+        makedirs(self._cache_dir, exist_ok=True)
+        path = self._cache_path()
+        # Write to a temporary file first so readers never see a partial cache
+        tmp = f"{path}.{getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(cache, fh, separators=(",", ":"))
+        replace(tmp, path)
+        self.log.debug("_write_cache: wrote %d pages to %s", len(pages), path)
+
+    def write_snapshot(self, path: str):
+        """
+        Write the challenges of every subscription to a snapshot at `path`,
+        gzip compressed when it ends in `.gz`, that can be loaded with the
+        `snapshot` option rather than fetching from Fastly.
+
+        Returns the number of challenges written.
+        """
+        challenges = self._list_tls_authorizations()
+        snapshot = {
+            "version": self.SNAPSHOT_VERSION,
+            "created_at": time.time(),
+            # Challenges are tuples and so written as lists
+            "challenges": challenges,
+        }
+
+        data = json.dumps(snapshot, separators=(",", ":")).encode()
+        if path.endswith(".gz"):
+            data = gzip.compress(data)
+
+        # Write to a temporary file first so readers never see a partial file
+        tmp = f"{path}.{getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        replace(tmp, path)
+        self.log.info(
+            "write_snapshot: wrote %d challenges to %s", len(challenges), path
+        )
+        return len(challenges)
+
+    def _read_snapshot(self):
+        """
+        Read the challenges from the configured `snapshot`.
+        """
+        with open(self._snapshot, "rb") as fh:
+            data = fh.read()
+        if self._snapshot.endswith(".gz"):
+            data = gzip.decompress(data)
+        snapshot = json.loads(data)
+
+        if snapshot.get("version") != self.SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot version {snapshot.get('version')} in {self._snapshot}"
+            )
+
+        challenges = tuple(
+            _Challenge(*map(intern, challenge))
+            for challenge in snapshot["challenges"]
+            if self._in_zones(challenge[1])
+        )
+        self.log.debug(
+            "_read_snapshot: read %d challenges from %s",
+            len(challenges),
+            self._snapshot,
+        )
+        return challenges
+
+    def _url(self):
+        if self._endpoint == "domains":
+            return self.TLS_DOMAINS_URL
+        return self.TLS_SUBSCRIPTIONS_URL
+
+    def _page_request(
+        self, number: int, cached=None, domain: Optional[str] = None
+    ):
+        """
+        Build the params and headers to request a page of TLS subscriptions.
+
+        When a `cached` copy of the page is given the request is made
+        conditional on its `ETag`. When a `domain` is given only subscriptions
+        that include it are listed.
+        """
+        headers = {"Fastly-Key": self._token}
+        if cached is not None and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+
+        params = {**self._params, "page[number]": number}
+        if domain is not None:
+            params["filter[tls_domains.id]"] = domain
+
+        return params, headers
+
+    def _list_tls_authorizations_page(
+        self, number: int, cached=None, domain: Optional[str] = None
+    ):
+        """
+        Fetch a single page of TLS subscriptions.
+
+        See `_page_request` and `_page_response`.
+        """
+        params, headers = self._page_request(number, cached, domain)
+        kwargs = {"stream": True} if self._stream else {}
+        attempt = 0
         while True:
+            start = time.perf_counter()
             resp = self._session.get(
-                "https://api.fastly.com/tls/subscriptions",
-                params={"include": "tls_authorizations", "page[number]": page},
-                headers={"Fastly-Key": self._token},
+                self._url(), params=params, headers=headers, **kwargs
+            )
+            self._metrics.timing(
+                "page.request",
+                time.perf_counter() - start,
+                page=number,
+                status=resp.status_code,
             )
-            resp.raise_for_status()  # Error on non-200 responses
+            delay = self._retry_delay(resp, number, attempt)
+            if delay is None:
+                break
+            resp.close()
+            time.sleep(delay)
+            attempt += 1
+        return self._page_response(resp, number, cached)
+
+    def _retry_delay(self, resp, number: int, attempt: int):
+        """
+        Decide whether, and after how long, a request should be retried.
 
-            page = resp.json()
+        Returns `None` when the response should be used as-is, either because
+        it isn't a rate limit or server error or because `max_retries` has
+        been reached. Otherwise the number of seconds to wait, from the
+        `Retry-After` header, then the `Fastly-RateLimit-Reset` header when
+        `Fastly-RateLimit-Remaining` is exhausted, then jittered exponential
+        backoff, never more than `retry_max_backoff`.
+        """
+        if (
+            resp.status_code not in self.RETRY_STATUS_CODES
+            or attempt >= self._max_retries
+        ):
+            return None
 
+        delay = None
+        headers = resp.headers
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = (
+                        parsedate_to_datetime(retry_after).timestamp()
+                        - time.time()
+                    )
+                except (TypeError, ValueError):
+                    self.log.debug(
+                        "_retry_delay: ignoring invalid Retry-After %s",
+                        retry_after,
+                    )
+        elif headers.get("Fastly-RateLimit-Remaining") == "0":
+            reset = headers.get("Fastly-RateLimit-Reset")
+            if reset:
+                try:
+                    delay = float(reset) - time.time()
+                except ValueError:
+                    self.log.debug(
+                        "_retry_delay: ignoring invalid Fastly-RateLimit-Reset %s",
+                        reset,
+                    )
+
+        if delay is None:
+            # Full jitter, spreads out retries from concurrent requests
+            delay = uniform(
+                0,
+                min(self._retry_max_backoff, self._retry_backoff * 2**attempt),
+            )
+        delay = min(max(0.0, delay), self._retry_max_backoff)
+
+        self._metrics.record("page.retry", page=number, status=resp.status_code)
+
+        self.log.warning(
+            "_retry_delay: tls subscription page %d returned %d, retrying in %.1fs (%d of %d)",
+            number,
+            resp.status_code,
+            delay,
+            attempt + 1,
+            self._max_retries,
+        )
+        return delay
+
+    def _page_response(self, resp, number: int, cached=None):
+        """
+        Handle the response to a request for a page of TLS subscriptions.
+
+        Returns the page's `ETag` and `total_pages` along with the challenges
+        of the TLS authorizations it included. The `cached` copy of the page
+        is returned if the page has not been modified.
+        """
+        if resp.status_code == 304:
             self.log.debug(
-                "_list_tls_authorizations: received tls subscription page %d of %d",
-                page["meta"]["current_page"],
-                page["meta"]["total_pages"],
+                "_page_response: tls subscription page %d not modified", number
             )
+            self._metrics.record("page.not_modified", page=number)
+            return cached
+        resp.raise_for_status()  # Error on non-200 responses
+
+        # When streaming this includes receiving the body
+        with self._metrics.timer("page.decode", page=number):
+            if self._stream:
+                meta, challenges = self._parse_page_stream(resp, number)
+            elif self._decode_page is not None:
+                content = resp.content
+                self._metrics.record("page.bytes", len(content), page=number)
+                meta, challenges = self._parse_typed_page(
+                    self._decode_page(content)
+                )
+            else:
+                self._metrics.record(
+                    "page.bytes", len(resp.content), page=number
+                )
+                meta, challenges = self._parse_page(
+                    _iter_page_members(resp.json())
+                )
+
+        self.log.debug(
+            "_page_response: received tls subscription page %d of %d",
+            meta["current_page"],
+            meta["total_pages"],
+        )
+        self.log.debug(
+            "_page_response: found %d challenges on page %d",
+            len(challenges),
+            meta["current_page"],
+        )
+
+        return {
+            "etag": resp.headers.get("ETag"),
+            "total_pages": meta["total_pages"],
+            "challenges": challenges,
+        }
 
-            previous_count = len(authorizations)
+    def _parse_page_stream(self, resp, number: int):
+        """
+        Parse a page of TLS subscriptions as its body is received.
 
-            authorizations.extend(
-                # Ensure we only have a list of authorizations
-                [
-                    authorization
-                    for authorization in page["included"]
-                    if authorization["type"] == "tls_authorization"
-                ]
+        The subscriptions and included resources are decoded, and discarded,
+        one at a time, see `_parse_page`.
+        """
+        sizes = []
+
+        def count(chunk):
+            sizes.append(len(chunk))
+            return chunk
+
+        chunks = iterdecode(
+            map(count, resp.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)),
+            "utf-8",
+        )
+        try:
+            return self._parse_page(
+                _iter_json_object(chunks, streamed=("data", "included"))
             )
+        finally:
+            resp.close()
+            self._metrics.record("page.bytes", sum(sizes), page=number)
 
-            self.log.debug(
-                "_list_tls_authorizations: found %d authorizations on page %d",
-                len(authorizations) - previous_count,
-                page["meta"]["current_page"],
+    def _parse_typed_page(self, page):
+        """
+        Parse a page of TLS subscriptions decoded by `octodns_fastly._typed`,
+        keeping the same parts as `_parse_page`.
+        """
+        allowed = None
+        if self._subscription_states is not None:
+            allowed = {
+                reference.id
+                for subscription in page.data
+                if subscription.attributes.state in self._subscription_states
+                for reference in subscription.relationships.tls_authorizations.data
+            }
+
+        challenges = [
+            _Challenge(
+                intern(challenge.type),
+                intern(challenge.record_name),
+                intern(challenge.values[0] if challenge.values else ""),
             )
+            for authorization in page.included
+            if authorization.type == "tls_authorization"
+            and (allowed is None or authorization.id in allowed)
+            for challenge in authorization.attributes.challenges
+            if self._in_zones(challenge.record_name)
+        ]
+        meta = {
+            "current_page": page.meta.current_page,
+            "total_pages": page.meta.total_pages,
+        }
+        return meta, challenges
 
-            if page["meta"]["current_page"] == page["meta"]["total_pages"]:
-                self.log.debug(
-                    "_list_tls_authorizations: found %d authorizations total",
-                    len(authorizations),
+    def _parse_page(self, members):
+        """
+        Parse the `(key, value)` members of a page of TLS subscriptions, with
+        the items of `data` and `included` as separate members.
+
+        Only the page's `meta` and the challenges of its TLS authorizations are
+        kept. When `subscription_states` is configured only the challenges of
+        subscriptions in one of those states are. Pages of TLS domains, with
+        their authorizations included, are parsed the same way.
+        """
+        meta = None
+        # The ids of the authorizations of subscriptions in an allowed state
+        allowed = set()
+        authorizations = []
+        for key, value in members:
+            if key == "meta":
+                meta = value
+            elif (
+                key == "data"
+                and self._subscription_states is not None
+                and value["attributes"]["state"] in self._subscription_states
+            ):
+                allowed.update(
+                    authorization["id"]
+                    for authorization in value["relationships"][
+                        "tls_authorizations"
+                    ]["data"]
+                )
+            # Ensure we only have challenges from authorizations
+            elif key == "included" and value["type"] == "tls_authorization":
+                # Subscriptions aren't guaranteed to come before the included
+                # authorizations, so hold onto their compact challenges until
+                # the end of the page
+                authorizations.append(
+                    (value["id"], list(_Challenge.parse(value)))
                 )
-                return authorizations
 
-            page = page["meta"]["current_page"] + 1
+        challenges = [
+            challenge
+            for authorization_id, authorization_challenges in authorizations
+            if self._subscription_states is None or authorization_id in allowed
+            for challenge in authorization_challenges
+            if self._in_zones(challenge.record_name)
+        ]
+        return meta, challenges
+
+    def _fetch_pages(
+        self, cached_pages, domain: Optional[str] = None, known: int = 1
+    ):
+        """
+        Fetch every page of TLS subscriptions.
+
+        The first `known` pages, those that are known to exist, are fetched to
+        learn `meta.total_pages`, the remaining pages are then fetched. Both
+        are fetched concurrently by up to `max_workers` threads. Results are
+        merged in page order so the output is deterministic.
+        """
+
+        def fetch(number):
+            cached = _cached_page(cached_pages, number)
+            return self._list_tls_authorizations_page(number, cached, domain)
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            # `map` yields results in the order of the page numbers
+            pages = list(executor.map(fetch, range(1, known + 1)))
+            remaining = range(known + 1, pages[-1]["total_pages"] + 1)
+            pages.extend(executor.map(fetch, remaining))
+
+        return pages
 
-    def _list_challenges(self):
+    def _list_tls_authorizations(self, domain: Optional[str] = None):
+        """
+        Fetch TLS subscriptions and return the challenges of their TLS
+        authorizations.
+
+        When a `domain` is given only the subscriptions that include it are
+        fetched.
+
+        The challenges are kept in a cache shared by every source in the
+        process, keyed on the token and request parameters, to avoid making
+        multiple requests to the Fastly API on every call to populate a zone,
+        or from every source configured with the same token, when the
+        responses will be the same per Fastly account. They're fetched again
+        once they're `cache_ttl` seconds old.
+
+        When a `snapshot` is configured its challenges are used instead,
+        regardless of `domain`.
+        """
+        if self._snapshot is not None:
+            return _shared_cache.get(
+                ("snapshot", self._snapshot, self._zones), self._read_snapshot
+            )
+
+        key = (self._token, self._cache_key(), domain)
+        return _shared_cache.get(
+            key,
+            lambda: self._fetch_tls_authorizations(domain),
+            max_age=self._cache_ttl,
+        )
+
+    def _fetch_tls_authorizations(self, domain: Optional[str] = None):
+        """
+        Fetch TLS subscriptions and return the challenges of their TLS
+        authorizations, see `_list_tls_authorizations`.
+
+        When `cache_dir` is configured the pages are served from disk for
+        `cache_ttl` seconds, after which they're revalidated with conditional
+        requests, with `incremental` all at once, see `_refresh_pages`.
+        Listings filtered by `domain` are never cached on disk.
+        """
+        cache = self._read_cache() if domain is None else None
+        now = time.time()
+        if cache is not None and now - cache["fetched_at"] < self._cache_ttl:
+            self.log.debug("_fetch_tls_authorizations: using fresh cache")
+            self._metrics.record("cache.hit")
+            pages = cache["pages"]
+        else:
+            if cache is not None:
+                self._metrics.record("cache.stale")
+            elif self._cache_dir is not None and domain is None:
+                self._metrics.record("cache.miss")
+            pages = None
+            if self._incremental and cache is not None:
+                pages = self._refresh_pages(cache["pages"])
+            if pages is None:
+                pages = self._fetch_pages(
+                    cache["pages"] if cache is not None else [], domain
+                )
+            if domain is None:
+                self._write_cache(pages)
+
+        # A tuple as the challenges are shared between sources
+        challenges = tuple(
+            challenge for page in pages for challenge in page["challenges"]
+        )
+
+        self.log.debug(
+            "_fetch_tls_authorizations: found %d challenges total",
+            len(challenges),
+        )
+        self.log.info("_fetch_tls_authorizations: %s", self._metrics.summary())
+        return challenges
+
+    def _refresh_pages(self, cached_pages):
+        """
+        Refresh the cached pages, trusting that none of them have gone.
+
+        Every cached page is revalidated with a conditional request at once,
+        rather than waiting on the first page to learn `total_pages`, and then
+        any new pages after them are fetched. Subscriptions are listed in the
+        order they were created, so new ones only change the last page, or add
+        pages, and the pages before it are `304`s. When subscriptions have
+        been deleted and there are fewer pages `None` is returned so that
+        everything is fetched.
+        """
+        pages = self._fetch_pages(cached_pages, known=len(cached_pages))
+        if pages[-1]["total_pages"] < len(cached_pages):
+            self.log.info(
+                "_refresh_pages: tls subscriptions have shrunk, fetching all pages"
+            )
+            return None
+
+        self.log.debug(
+            "_refresh_pages: revalidated %d pages, fetched %d new",
+            len(cached_pages),
+            len(pages) - len(cached_pages),
+        )
+        return pages
+
+    def _list_challenges(self, *domains: str):
         """
         Fetch a list of ACME DNS challenges out of the TLS authorizations.
+
+        When `domains` are given only the subscriptions that include one of
+        them are considered, and their listings are fetched concurrently with
+        up to `max_workers` requests in flight, otherwise every subscription
+        is. Everything is fetched up front, before the first challenge is
+        returned.
         """
-        for authorization in self._list_tls_authorizations():
-            for challenge in authorization["attributes"]["challenges"]:
-                yield challenge
+        if not domains:
+            return self._list_tls_authorizations(None)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            return chain.from_iterable(
+                list(executor.map(self._list_tls_authorizations, domains))
+            )
 
-    def _challenges(self, zone: Zone):
+    @lru_cache(maxsize=None)
+    def _challenge_index(self, *domains: str):
         """
-        List ACME DNS challenges for the given zone.
+        Build an index from zone name to the ACME DNS challenges within it,
+        see `_build_index`.
+
+        `domains` limits the subscriptions considered, see `_list_challenges`.
+        """
+        if not domains:
+            self._indexed_all = True
+        return self._build_index(self._list_challenges(*domains))
+
+    def _build_index(self, challenges):
+        """
+        Build an index from zone name to the ACME DNS challenges within it.
+
+        Each challenge is added under every zone it could belong to by walking
+        the labels of its record name, e.g. `_acme-challenge.www.example.com`
+        is indexed as `_acme-challenge.www` in `example.com.` and as
+        `_acme-challenge` in `www.example.com.`. Records that belong to a
+        sub-zone are left for `Zone.add_record` to reject so the longest
+        matching zone ends up with them. When `zones` are configured only they
+        are indexed.
 
         When certificates are requested for the root of a domain and it's wildcard (`*.example.com`),
         Fastly returns two challenges with the same record name and value which need to be deduplicated.
         """
-        suffix = "." + zone.name[:-1]
+        start = time.perf_counter()
+        index = defaultdict(list)
         # Filter out duplicate challenges included in the TLS subscriptions response
-        challenges = set()
-        for challenge in self._list_challenges():
-            if challenge["type"] == "managed-dns" and challenge[
-                "record_name"
-            ].endswith(suffix):
-                name = challenge["record_name"][: -len(suffix)]
-                value = f"{challenge['values'][0]}."  # Append a trailing dot
-                if (name, value) not in challenges:
-                    challenges.add((name, value))
-                    yield (name, value)
-                else:
-                    self.log.debug(
-                        f"_challenges: skipping duplicate challenge {name}.{zone.name}"
-                    )
+        seen = set()
+        for challenge in challenges:
+            if challenge.type != "managed-dns":
+                continue
+
+            record_name = challenge.record_name
+            value = f"{challenge.value}."  # Append a trailing dot
+            if (record_name, value) in seen:
+                self.log.debug(
+                    "_build_index: skipping duplicate challenge %s", record_name
+                )
+                continue
+            seen.add((record_name, value))
+
+            labels = record_name.split(".")
+            for i in range(1, len(labels)):
+                zone_name = ".".join(labels[i:]) + "."
+                if self._zones is None or zone_name in self._zones:
+                    index[zone_name].append((".".join(labels[:i]), value))
+        self._metrics.timing("index.build", time.perf_counter() - start)
+
+        self.log.debug(
+            "_build_index: indexed %d challenges in %d zones",
+            len(seen),
+            len(index),
+        )
+        return index
+
+    def _in_zones(self, record_name: str):
+        """
+        Whether the record name is within one of the configured `zones`,
+        always true without them.
+        """
+        if self._zones is None:
+            return True
+        labels = record_name.split(".")
+        return any(
+            ".".join(labels[i:]) + "." in self._zones
+            for i in range(1, len(labels))
+        )
+
+    def _filter_by_zone(self, zone: Zone):
+        """
+        Decide whether the zone should be populated from a filtered listing.
+
+        The first `zone_filter_threshold` distinct zones are, every zone after
+        that uses the full listing which is fetched once and shared. A
+        `snapshot` always has the full listing. See `_zone_domains` for the
+        domains filtered by.
+        """
+        if self._snapshot is not None:
+            return False
+        with self._filtered_zones_lock:
+            if zone.name in self._filtered_zones:
+                return True
+            if len(self._filtered_zones) < self._zone_filter_threshold:
+                self._filtered_zones.add(zone.name)
+                return True
+        return False
+
+    def _challenges(self, zone: Zone):
+        """
+        List ACME DNS challenges for the given zone.
+        """
+        if self._zones is not None and zone.name not in self._zones:
+            self.log.warning(
+                "_challenges: %s isn't one of the configured zones", zone.name
+            )
+            return []
+        domains = (
+            self._zone_domains(zone) if self._filter_by_zone(zone) else None
+        )
+        if domains is not None:
+            self.log.debug(
+                "_challenges: filtering subscriptions by %d domains",
+                len(domains),
+            )
+            index = self._challenge_index(*domains)
+        else:
+            index = self._challenge_index()
+        return index.get(zone.name, [])
+
+    def _zone_domains(self, zone: Zone):
+        """
+        List the domains to filter subscriptions by to find every challenge in
+        the zone.
+
+        Fastly can only filter on exact domains, so along with the zone's apex
+        these are the names below it that certificates were requested for in
+        the last full listing cached in `cache_dir`, each with its wildcard.
+        Returns `None`, for the full listing to be used, when it's already
+        indexed or cached within `cache_ttl` seconds, as it then takes no
+        requests at all, when there's no full listing from within
+        `full_refresh_interval` seconds, so that certificates for new names
+        below the apex are picked up at least that often, or when filtering
+        would take more requests than the full listing.
+        """
+        if self._indexed_all:
+            self.log.debug(
+                "_zone_domains: full listing indexed, not filtering %s",
+                zone.name,
+            )
+            return None
+        cache = self._read_cache()
+        if cache is None:
+            self.log.debug(
+                "_zone_domains: no full listing cached, not filtering %s",
+                zone.name,
+            )
+            return None
+        age = time.time() - cache["fetched_at"]
+        if age < self._cache_ttl or age >= self._full_refresh_interval:
+            self.log.debug(
+                "_zone_domains: full listing is %ds old, not filtering %s",
+                age,
+                zone.name,
+            )
+            return None
+
+        apex = zone.name[:-1]
+        suffix = f".{apex}"
+        # Names in sub-zones are left to be filtered by their own zone
+        sub_zone_suffixes = tuple(
+            f".{sub_zone}{suffix}" for sub_zone in zone.sub_zones
+        )
+        names = {apex}
+        for page in cache["pages"]:
+            for challenge in page["challenges"]:
+                # e.g. `_acme-challenge.www.example.com` for `www.example.com`
+                # and `*.www.example.com`
+                name = challenge.record_name.split(".", 1)[-1]
+                if name.endswith(suffix) and not f".{name}".endswith(
+                    sub_zone_suffixes
+                ):
+                    names.add(name)
+
+        domains = tuple(
+            domain for name in sorted(names) for domain in (name, f"*.{name}")
+        )
+        # Each domain is a request of its own
+        if len(domains) > len(cache["pages"]):
+            self.log.debug(
+                "_zone_domains: %d domains in %s, more than the full listing's %d pages",
+                len(domains),
+                zone.name,
+                len(cache["pages"]),
+            )
+            return None
+        return domains
+
+    def list_zones(self):
+        """
+        List the configured `zones` that have ACME DNS challenges, for dynamic
+        zone config.
+
+        Requires `zones`, the names certificates were requested for can't be
+        told apart from zones, e.g. a certificate for only `www.example.com`
+        belongs in `example.com.`.
+        """
+        if self._zones is None:
+            raise ValueError("list_zones requires zones to be configured")
+
+        zones = sorted(self._challenge_index())
+        self.log.info("list_zones: found %d zones", len(zones))
+        return zones
+
+    def zone_fingerprints(self, zone_names=None):
+        """
+        Fingerprint the ACME DNS challenge records of each of `zone_names`,
+        the configured `zones` by default.
+
+        Returns a mapping of zone name to a digest of its `(name, value, ttl)`
+        records that only changes when they do, including zones that don't
+        have any. Records that belong in a sub-zone, another of the zones, are
+        only included in its fingerprint as that's where they're populated.
+        """
+        return self._fingerprint_index(self._challenge_index(), zone_names)
+
+    def _fingerprint_index(self, index, zone_names=None):
+        if zone_names is None:
+            if self._zones is None:
+                raise ValueError(
+                    "zone names are required when zones aren't configured"
+                )
+            zone_names = self._zones
+
+        fingerprints = {}
+        for zone_name in zone_names:
+            suffix = f".{zone_name}"
+            sub_zone_suffixes = tuple(
+                f".{other[:-len(suffix)]}"
+                for other in zone_names
+                if other.endswith(suffix)
+            )
+            records = sorted(
+                (name, value)
+                for name, value in index.get(zone_name, [])
+                if not f".{name}".endswith(sub_zone_suffixes)
+            )
+            fingerprints[zone_name] = sha256(
+                json.dumps([self._ttl, records]).encode()
+            ).hexdigest()
+        return fingerprints
+
+    def read_fingerprints(self, path: str):
+        """
+        Read the fingerprints written to `path` by `write_fingerprints`, empty
+        when there aren't any yet.
+        """
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            self.log.info("read_fingerprints: no fingerprints at %s", path)
+            return {}
+
+        if data.get("version") != self.FINGERPRINTS_VERSION:
+            raise ValueError(
+                f"Unsupported fingerprints version {data.get('version')} in {path}"
+            )
+        return data["fingerprints"]
+
+    def write_fingerprints(self, path: str, fingerprints=None):
+        """
+        Write the current `zone_fingerprints`, or the given `fingerprints`, to
+        `path` for `changed_zones` to compare against later.
+        """
+        if fingerprints is None:
+            fingerprints = self.zone_fingerprints()
+        data = {
+            "version": self.FINGERPRINTS_VERSION,
+            "created_at": time.time(),
+            "fingerprints": fingerprints,
+        }
+
+        # Write to a temporary file first so readers never see a partial file
+        tmp = f"{path}.{getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(data, fh, separators=(",", ":"), sort_keys=True)
+        replace(tmp, path)
+        self.log.info(
+            "write_fingerprints: wrote %d zones to %s", len(fingerprints), path
+        )
+
+    def changed_zones(self, path: str, fingerprints=None):
+        """
+        List the zones whose challenge records have changed since the
+        fingerprints at `path` were written, compared to the current
+        `zone_fingerprints`, or the given `fingerprints`. Including zones that
+        have gained their first, or lost their last, challenge. Every zone has
+        changed when there are no fingerprints at `path` yet.
+        """
+        current = fingerprints
+        if current is None:
+            current = self.zone_fingerprints()
+        changed = _changed_zones(self.read_fingerprints(path), current)
+        self.log.info(
+            "changed_zones: %d of %d zones have changed",
+            len(changed),
+            len(current),
+        )
+        return changed
+
+    def poll(self, zone_names=None):
+        """
+        Fetch the challenges of every subscription again and return the
+        `zone_fingerprints` of `zone_names`, the configured `zones` by
+        default, as they are now.
+
+        The pages of the previous poll are revalidated with conditional
+        requests, so an unchanged account only costs a `304` per page. Nothing
+        else is cached between polls, nor is anything used by `populate`
+        changed.
+        """
+        return self._fingerprint_index(
+            self._build_index(self._poll_challenges()), zone_names
+        )
+
+    def _poll_challenges(self):
+        if self._snapshot is not None:
+            return self._read_snapshot()
+        self._polled_pages = self._fetch_pages(self._polled_pages)
+        return [
+            challenge
+            for page in self._polled_pages
+            for challenge in page["challenges"]
+        ]
+
+    def watch(
+        self,
+        callback: Callable,
+        interval: float = DEFAULT_WATCH_INTERVAL,
+        previous: Optional[dict] = None,
+        polls: Optional[int] = None,
+        zone_names=None,
+    ):
+        """
+        `poll` `zone_names`, the configured `zones` by default, every
+        `interval` seconds and call `callback(zones, fingerprints)` with the
+        zones whose challenge records have changed since the previous poll,
+        when there are any, and the fingerprints of the current poll.
+
+        The first poll is compared against the `previous` fingerprints, e.g.
+        from `read_fingerprints`, when they're given, otherwise it's only the
+        starting point. Polls that fail are logged and tried again after the
+        next interval. Runs forever, or until `polls` polls have been made.
+        Raises `ValueError` up front when there are no zone names to poll.
+        """
+        if zone_names is None and self._zones is None:
+            raise ValueError(
+                "zone names are required when zones aren't configured"
+            )
+
+        count = 0
+        while polls is None or count < polls:
+            if count:
+                time.sleep(interval)
+            count += 1
+
+            try:
+                current = self.poll(zone_names)
+            except Exception:
+                self.log.warning("watch: poll failed", exc_info=True)
+                continue
+
+            if previous is not None:
+                changed = _changed_zones(previous, current)
+                self.log.info("watch: %d zones have changed", len(changed))
+                if changed:
+                    callback(changed, current)
+            previous = current
 
     def populate(self, zone: Zone, target=False, lenient=False):
         self.log.debug(
             f"populate: name={zone.name}, target={target}, lenient={lenient}"
         )
 
+        start = time.perf_counter()
         before = len(zone.records)
 
+        # Records that belong in a sub-zone would only be rejected by
+        # `add_record`, skip them before they're built and validated. When
+        # lenient they're added, with a warning, as before.
+        sub_zones = set() if lenient else zone.sub_zones
+        sub_zone_suffixes = tuple(f".{sub_zone}" for sub_zone in sub_zones)
+        data = {"type": "CNAME", "ttl": self._ttl}
+
         for name, value in self._challenges(zone):
-            record = Record.new(
-                zone,
-                name,
-                {"type": "CNAME", "ttl": self._ttl, "value": value},
-                source=self,
-                lenient=lenient,
+            if name in sub_zones or name.endswith(sub_zone_suffixes):
+                self.log.debug("populate:   skipping subzone record %s", name)
+                continue
+
+            data["value"] = value
+            record = Record.new(zone, name, data, source=self, lenient=lenient)
+            zone.add_record(record, lenient=lenient)
+
+        elapsed = time.perf_counter() - start
+        self._metrics.timing("zone.populate", elapsed, zone=zone.name)
+        self.log.info(
+            "populate:   found %s records in %.3fs",
+            len(zone.records) - before,
+            elapsed,
+        )
+
+
+class FastlyAcmeAsyncSource(FastlyAcmeSource):
+    """
+    A `FastlyAcmeSource` that fetches TLS subscription pages with asyncio.
+
+    Pages are requested with [httpx](https://www.python-httpx.org/), at most
+    `max_workers` at a time, from a single event loop rather than a pool of
+    threads. `populate` is unchanged and can still be called synchronously,
+    including from async code, and `aprefetch` fetches without blocking the
+    caller's event loop.
+
+    Requires httpx, `pip install octodns-fastly[async]`.
+
+    ```yaml
+    providers:
+      fastly:
+        class: octodns_fastly.FastlyAcmeAsyncSource
+        token: env/FASTLY_API_TOKEN
+    ```
+    """
+
+    def __init__(
+        self,
+        id: str,
+        token: Optional[str] = None,
+        *args,
+        prefetch: bool = False,
+        **kwargs,
+    ):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError(
+                "FastlyAcmeAsyncSource requires httpx, install octodns-fastly[async]"
             )
+        self._httpx = httpx
 
-            try:
-                zone.add_record(record, lenient=lenient)
-            except SubzoneRecordException:
-                self.log.debug("populate:   skipping subzone record %s", record)
+        super().__init__(id, token, *args, **kwargs)
+
+        if self._stream:
+            raise ValueError("FastlyAcmeAsyncSource does not support stream")
+
+        # Only once everything that's used to fetch has been set up
+        if prefetch:
+            self._start_prefetch()
+
+    def _async_client(self):
+        httpx = self._httpx
+        return httpx.AsyncClient(
+            headers=self._headers,
+            timeout=httpx.Timeout(
+                self._read_timeout, connect=self._connect_timeout
+            ),
+            limits=httpx.Limits(
+                max_connections=self._pool_size,
+                max_keepalive_connections=self._pool_size,
+            ),
+        )
+
+    async def aprefetch(self):
+        """
+        `prefetch` without blocking the running event loop, so that fetching
+        overlaps with the caller's other async work.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.prefetch)
+
+    def _fetch_pages(
+        self, cached_pages, domain: Optional[str] = None, known: int = 1
+    ):
+        def run():
+            return asyncio.run(
+                self._fetch_pages_async(cached_pages, domain, known)
+            )
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return run()
+        # Called from a coroutine, e.g. `populate` from async code, where
+        # `asyncio.run` can't be used, so run a loop of our own in a thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(run).result()
+
+    async def _fetch_pages_async(
+        self, cached_pages, domain: Optional[str] = None, known: int = 1
+    ):
+        """
+        Fetch every page of TLS subscriptions.
+
+        As with `FastlyAcmeSource._fetch_pages` the first `known` pages are
+        fetched and then the rest, concurrently, limited by a semaphore.
+        """
+        semaphore = asyncio.Semaphore(self._max_workers)
+
+        async with self._async_client() as client:
+
+            async def fetch(number):
+                cached = _cached_page(cached_pages, number)
+                params, headers = self._page_request(number, cached, domain)
+                attempt = 0
+                while True:
+                    async with semaphore:
+                        start = time.perf_counter()
+                        resp = await client.get(
+                            self._url(), params=params, headers=headers
+                        )
+                    self._metrics.timing(
+                        "page.request",
+                        time.perf_counter() - start,
+                        page=number,
+                        status=resp.status_code,
+                    )
+                    delay = self._retry_delay(resp, number, attempt)
+                    if delay is None:
+                        break
+                    # Don't hold onto the semaphore while waiting
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                return self._page_response(resp, number, cached)
+
+            # `gather` returns results in the order of its arguments
+            first = await asyncio.gather(
+                *(fetch(number) for number in range(1, known + 1))
+            )
+            rest = await asyncio.gather(
+                *(
+                    fetch(number)
+                    for number in range(known + 1, first[-1]["total_pages"] + 1)
+                )
+            )
+
+        return [*first, *rest]
+
+
+class FastlyAcmeMultiSource(FastlyAcmeSource):
+    """
+    A `FastlyAcmeSource` for ACME DNS challenges across many Fastly accounts.
+
+    The accounts are fetched in parallel and their challenges merged, and
+    deduplicated, into a single index. How long each account took is logged
+    and kept in `account_timings`.
+
+    `tokens` is either a mapping of account name to token or a list of tokens
+    that are then named by their position, both allow `env/` references.
+    Every other option applies to each account, apart from
+    `zone_filter_threshold` which isn't supported.
+
+    ```yaml
+    providers:
+      fastly:
+        class: octodns_fastly.FastlyAcmeMultiSource
+        tokens:
+          production: env/FASTLY_PRODUCTION_API_TOKEN
+          staging: env/FASTLY_STAGING_API_TOKEN
+    ```
+    """
+
+    # Each account has a source, and token, of its own
+    REQUIRES_TOKEN = False
+
+    def __init__(
+        self, id: str, tokens, *args, prefetch: bool = False, **kwargs
+    ):
+        if kwargs.get("zone_filter_threshold"):
+            # Each account's listing would need filtering by its own cache
+            raise ValueError(
+                "FastlyAcmeMultiSource doesn't support zone_filter_threshold"
+            )
+        super().__init__(id, None, *args, **kwargs)
+
+        if not isinstance(tokens, dict):
+            # octoDNS only resolves `env/` references in mappings
+            tokens = {
+                str(i): self._resolve_token(token)
+                for i, token in enumerate(tokens)
+            }
+        if not tokens:
+            raise ValueError(
+                "FastlyAcmeMultiSource requires at least one token"
+            )
+
+        self._accounts = {
+            name: FastlyAcmeSource(f"{id}[{name}]", token, *args, **kwargs)
+            for name, token in tokens.items()
+        }
+        self.account_timings = {}
+
+        # Prefetching fetches every account, once they've all been set up
+        if prefetch:
+            self._start_prefetch()
+
+    @staticmethod
+    def _resolve_token(token: str):
+        """
+        Resolve an `env/NAME` reference to the value of the environment
+        variable, other tokens are used as-is.
+        """
+        if not token.startswith("env/"):
+            return token
+        name = token[4:]
+        try:
+            return environ[name]
+        except KeyError:
+            raise ValueError(
+                f"FastlyAcmeMultiSource token references missing env var {name}"
+            )
+
+    def _list_tls_authorizations(self, domain: Optional[str] = None):
+        """
+        Fetch the challenges of every account in parallel.
+
+        A `snapshot` already has the challenges of every account.
+        """
+        if self._snapshot is not None:
+            return super()._list_tls_authorizations(domain)
+
+        with ThreadPoolExecutor(max_workers=len(self._accounts)) as executor:
+            # `map` yields results in the order of the accounts
+            challenges = tuple(
+                challenge
+                for account_challenges in executor.map(
+                    lambda name: self._list_account_tls_authorizations(
+                        name, domain
+                    ),
+                    self._accounts,
+                )
+                for challenge in account_challenges
+            )
+
+        self.log.debug(
+            "_list_tls_authorizations: found %d challenges in %d accounts",
+            len(challenges),
+            len(self._accounts),
+        )
+        return challenges
+
+    def _list_account_tls_authorizations(
+        self, name: str, domain: Optional[str] = None
+    ):
+        start = time.monotonic()
+        challenges = self._accounts[name]._list_tls_authorizations(domain)
+        elapsed = time.monotonic() - start
+        self.account_timings[name] = elapsed
 
         self.log.info(
-            "populate:   found %s records", len(zone.records) - before
+            "_list_account_tls_authorizations: account %s found %d challenges in %.2fs",
+            name,
+            len(challenges),
+            elapsed,
         )
+        return challenges
+
+    def _poll_challenges(self):
+        if self._snapshot is not None:
+            return super()._poll_challenges()
+        with ThreadPoolExecutor(max_workers=len(self._accounts)) as executor:
+            return [
+                challenge
+                for account_challenges in executor.map(
+                    lambda account: account._poll_challenges(),
+                    self._accounts.values(),
+                )
+                for challenge in account_challenges
+            ]
@@ -0,0 +1,63 @@
+"""
+Typed decoding, with msgspec, of the parts of a page of TLS subscriptions, or
+domains, that are used. Everything else in the page is skipped over.
+"""
+
+from typing import List, Optional
+
+import msgspec
+
+
+class Meta(msgspec.Struct):
+    current_page: int
+    total_pages: int
+
+
+class Reference(msgspec.Struct):
+    id: str
+
+
+class Relationship(msgspec.Struct):
+    data: List[Reference] = []
+
+
+class Relationships(msgspec.Struct):
+    tls_authorizations: Optional[Relationship] = None
+
+
+class Attributes(msgspec.Struct):
+    state: Optional[str] = None
+
+
+class Resource(msgspec.Struct):
+    attributes: Optional[Attributes] = None
+    relationships: Optional[Relationships] = None
+
+
+class Challenge(msgspec.Struct):
+    type: str
+    record_name: str
+    values: List[str] = []
+
+
+class AuthorizationAttributes(msgspec.Struct):
+    challenges: List[Challenge] = []
+
+
+class Included(msgspec.Struct):
+    id: str
+    type: str
+    attributes: Optional[AuthorizationAttributes] = None
+
+
+class Page(msgspec.Struct):
+    meta: Meta
+    data: List[Resource] = []
+    included: List[Included] = []
+
+
+_decoder = msgspec.json.Decoder(Page)
+
+
+def decode_page(content: bytes) -> Page:
+    return _decoder.decode(content)
@@ -0,0 +1,44 @@
+from octodns.manager import Manager
+
+from octodns_fastly import FastlyAcmeSource
+
+
+def load_source(parser, args):
+    """
+    Load the Manager config and return it along with the Fastly source named
+    by `args.source`, erroring through `parser` when there isn't one.
+    """
+    manager = Manager(args.config_file)
+    try:
+        source = manager.providers[args.source]
+    except KeyError:
+        parser.error(f"Unknown source '{args.source}'")
+    if not isinstance(source, FastlyAcmeSource):
+        parser.error(f"Source '{args.source}' is not a Fastly source")
+    return manager, source
+
+
+def source_zones(parser, manager, source):
+    """
+    List the names of the zones configured with `source`, erroring through
+    `parser` when there aren't any.
+
+    Dynamic zone config contributes every one of the source's `zones`, not
+    only those `list_zones` has challenges for right now, so that a zone's
+    first challenge is noticed too.
+    """
+    zone_names = set()
+    for zone_name, config in manager.config["zones"].items():
+        if source.id not in config.get("sources", []):
+            continue
+        if zone_name.startswith("*"):
+            if source._zones is None:
+                parser.error(
+                    f"Source '{source.id}' requires zones for dynamic zone config"
+                )
+            zone_names.update(source._zones)
+        else:
+            zone_names.add(zone_name)
+    if not zone_names:
+        parser.error(f"No zones are configured with source '{source.id}'")
+    return sorted(zone_names)
@@ -0,0 +1,55 @@
+"""
+Report the zones whose Fastly ACME DNS challenges have changed
+"""
+
+from os import replace
+
+from octodns.cmds.args import ArgumentParser
+
+from octodns_fastly.cmds import load_source, source_zones
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[1])
+
+    parser.add_argument(
+        "--config-file",
+        required=True,
+        help="The Manager configuration file to use",
+    )
+    parser.add_argument(
+        "--fingerprints",
+        required=True,
+        help="The file with the fingerprints of the zones the last time they were updated",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        default=False,
+        help="Mark the zones reported by the last run as updated, writing the fingerprints it saved alongside --fingerprints to it",
+    )
+    parser.add_argument(
+        "source", help="The configured Fastly source to fingerprint"
+    )
+
+    args = parser.parse_args()
+
+    manager, source = load_source(parser, args)
+    # The fingerprints of the reported zones, so that what's marked as updated
+    # is exactly what was reported, not anything that's changed since
+    pending = f"{args.fingerprints}.pending"
+    if args.update:
+        try:
+            replace(pending, args.fingerprints)
+        except FileNotFoundError:
+            parser.error(
+                f"No pending fingerprints at {pending}, report the changed zones first"
+            )
+        return
+
+    fingerprints = source.zone_fingerprints(
+        source_zones(parser, manager, source)
+    )
+    for zone_name in source.changed_zones(args.fingerprints, fingerprints):
+        print(zone_name)
+    source.write_fingerprints(pending, fingerprints)
@@ -0,0 +1,30 @@
+"""
+Snapshot the ACME DNS challenges of a Fastly source to a file
+"""
+
+from octodns.cmds.args import ArgumentParser
+
+from octodns_fastly.cmds import load_source
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[1])
+
+    parser.add_argument(
+        "--config-file",
+        required=True,
+        help="The Manager configuration file to use",
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="The file the snapshot is written to, gzip compressed when it ends in .gz (Note: will overwrite an existing file)",
+    )
+    parser.add_argument(
+        "source", help="The configured Fastly source to snapshot"
+    )
+
+    args = parser.parse_args()
+
+    _, source = load_source(parser, args)
+    source.write_snapshot(args.output)
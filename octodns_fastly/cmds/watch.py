@@ -0,0 +1,50 @@
+"""
+Watch a Fastly source and print the zones whose ACME DNS challenges change
+"""
+
+import json
+
+from octodns.cmds.args import ArgumentParser
+
+from octodns_fastly import FastlyAcmeSource
+from octodns_fastly.cmds import load_source, source_zones
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[1])
+
+    parser.add_argument(
+        "--config-file",
+        required=True,
+        help="The Manager configuration file to use",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=FastlyAcmeSource.DEFAULT_WATCH_INTERVAL,
+        help="Seconds between polls of Fastly",
+    )
+    parser.add_argument(
+        "--fingerprints",
+        help="The fingerprints of the zones the last time they were updated, by octodns-fastly-fingerprints, to compare the first poll against. Only ever read",
+    )
+    parser.add_argument("source", help="The configured Fastly source to watch")
+
+    args = parser.parse_args()
+
+    manager, source = load_source(parser, args)
+    zone_names = source_zones(parser, manager, source)
+    previous = None
+    if args.fingerprints:
+        previous = source.read_fingerprints(args.fingerprints)
+
+    def changed(zones, fingerprints):
+        # A JSON line per poll with changes
+        print(json.dumps({"zones": zones}), flush=True)
+
+    source.watch(
+        changed,
+        interval=args.interval,
+        previous=previous,
+        zone_names=zone_names,
+    )
@@ -20,13 +20,22 @@ def version():
 
 description, long_description = descriptions()
 
-tests_require = ('pytest', 'pytest-cov', 'pytest-network')
+tests_require = ('httpx', 'msgspec', 'pytest', 'pytest-cov', 'pytest-network')
 
 setup(
     author='Ross McFarland',
     author_email='rwmcfa1@gmail.com',
     description=description,
+    entry_points={
+        'console_scripts': (
+            'octodns-fastly-fingerprints = octodns_fastly.cmds.fingerprints:main',
+            'octodns-fastly-snapshot = octodns_fastly.cmds.snapshot:main',
+            'octodns-fastly-watch = octodns_fastly.cmds.watch:main',
+        )
+    },
     extras_require={
+        'async': ('httpx>=0.23.0',),
+        'fast': ('msgspec>=0.18.0',),
         'dev': tests_require
         + (
             # we need to manually/explicitely bump major versions as they're
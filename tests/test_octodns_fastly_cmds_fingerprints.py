@@ -0,0 +1,135 @@
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from octodns_fastly import _Challenge, _shared_cache
+from octodns_fastly.cmds.fingerprints import main
+
+CONFIG = """
+providers:
+  fastly:
+    class: octodns_fastly.FastlyAcmeSource
+    token: test_token
+  config:
+    class: octodns.provider.yaml.YamlProvider
+    directory: ./config
+    escaped_semicolons: false
+zones:
+  example.com.:
+    sources:
+      - fastly
+    targets:
+      - config
+  www.example.com.:
+    sources:
+      - fastly
+    targets:
+      - config
+  example.net.:
+    sources:
+      - config
+    targets:
+      - config
+"""
+
+
+class FingerprintsCmdTestCase(TestCase):
+    def setUp(self):
+        _shared_cache.clear()
+
+    def main(self, tmpdir, *args, config=CONFIG):
+        config_file = join(tmpdir, "config.yaml")
+        with open(config_file, "w") as fh:
+            fh.write(config)
+        argv = [
+            "octodns-fastly-fingerprints",
+            "--config-file",
+            config_file,
+            *args,
+        ]
+        with patch("sys.argv", argv), patch(
+            "octodns.cmds.args.ArgumentParser._setup_logging"
+        ), patch("builtins.print") as mock_print:
+            main()
+        return [c.args[0] for c in mock_print.call_args_list]
+
+    @patch("octodns_fastly.FastlyAcmeSource._list_tls_authorizations")
+    def test_fingerprints(self, mock_list):
+        challenge = _Challenge(
+            "managed-dns",
+            "_acme-challenge.www.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+        mock_list.return_value = (challenge,)
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "fingerprints.json")
+
+            # Only the zones configured with the source are reported
+            assert ["example.com.", "www.example.com."] == self.main(
+                tmpdir, "--fingerprints", path, "fastly"
+            )
+            assert not exists(path)
+
+            # A change after the zones were reported
+            mock_list.return_value = (
+                challenge._replace(value="fedcba0987654321"),
+            )
+            assert [] == self.main(
+                tmpdir, "--fingerprints", path, "--update", "fastly"
+            )
+            assert exists(path)
+            assert not exists(f"{path}.pending")
+
+            # isn't lost by updating
+            assert ["www.example.com."] == self.main(
+                tmpdir, "--fingerprints", path, "fastly"
+            )
+            self.main(tmpdir, "--fingerprints", path, "--update", "fastly")
+            assert [] == self.main(tmpdir, "--fingerprints", path, "fastly")
+
+            # There's nothing to update until zones have been reported
+            self.main(tmpdir, "--fingerprints", path, "--update", "fastly")
+            with self.assertRaises(SystemExit):
+                self.main(tmpdir, "--fingerprints", path, "--update", "fastly")
+
+    @patch("octodns_fastly.FastlyAcmeSource._list_tls_authorizations")
+    def test_fingerprints_dynamic_zones(self, mock_list):
+        mock_list.return_value = ()
+        config = CONFIG.replace(
+            "  example.net.:\n",
+            "  '*':\n    sources:\n      - fastly\n"
+            "    targets:\n      - config\n  example.net.:\n",
+        )
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "fingerprints.json")
+            # Dynamic zone config requires the source's zones
+            with self.assertRaises(SystemExit):
+                self.main(
+                    tmpdir, "--fingerprints", path, "fastly", config=config
+                )
+
+            # Every one of them is fingerprinted, even without challenges
+            config = config.replace(
+                "    token: test_token\n",
+                "    token: test_token\n    zones:\n"
+                "      - example.com.\n      - example.org.\n",
+            )
+            assert [
+                "example.com.",
+                "example.org.",
+                "www.example.com.",
+            ] == self.main(
+                tmpdir, "--fingerprints", path, "fastly", config=config
+            )
+
+    def test_fingerprints_without_zones(self):
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "fingerprints.json")
+            with self.assertRaises(SystemExit):
+                self.main(tmpdir, "--fingerprints", path, "config")
+            config = CONFIG.replace("      - fastly\n", "      - config\n")
+            with self.assertRaises(SystemExit):
+                self.main(
+                    tmpdir, "--fingerprints", path, "fastly", config=config
+                )
@@ -0,0 +1,59 @@
+import json
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from octodns_fastly import _shared_cache
+from octodns_fastly.cmds.snapshot import main
+
+CONFIG = """
+providers:
+  fastly:
+    class: octodns_fastly.FastlyAcmeSource
+    token: test_token
+  config:
+    class: octodns.provider.yaml.YamlProvider
+    directory: ./config
+    escaped_semicolons: false
+zones: {}
+"""
+
+
+class SnapshotCmdTestCase(TestCase):
+    def setUp(self):
+        _shared_cache.clear()
+
+    def main(self, tmpdir, *args):
+        config_file = join(tmpdir, "config.yaml")
+        with open(config_file, "w") as fh:
+            fh.write(CONFIG)
+        argv = ["octodns-fastly-snapshot", "--config-file", config_file, *args]
+        with patch("sys.argv", argv), patch(
+            "octodns.cmds.args.ArgumentParser._setup_logging"
+        ):
+            main()
+
+    @patch("octodns_fastly.FastlyAcmeSource._list_tls_authorizations")
+    def test_snapshot(self, mock_list):
+        mock_list.return_value = (
+            (
+                "managed-dns",
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+            ),
+        )
+        with TemporaryDirectory() as tmpdir:
+            output = join(tmpdir, "snapshot.json")
+            self.main(tmpdir, "--output", output, "fastly")
+
+            with open(output) as fh:
+                snapshot = json.load(fh)
+            assert [list(mock_list.return_value[0])] == snapshot["challenges"]
+
+    def test_invalid_source(self):
+        with TemporaryDirectory() as tmpdir:
+            output = join(tmpdir, "snapshot.json")
+            for source in ("missing", "config"):
+                with self.assertRaises(SystemExit):
+                    self.main(tmpdir, "--output", output, source)
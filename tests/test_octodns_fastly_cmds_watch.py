@@ -0,0 +1,150 @@
+import json
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock, call, patch
+
+from octodns_fastly import FastlyAcmeSource, _Challenge, _shared_cache
+from octodns_fastly.cmds.watch import main
+
+CONFIG = """
+providers:
+  fastly:
+    class: octodns_fastly.FastlyAcmeSource
+    token: test_token
+  config:
+    class: octodns.provider.yaml.YamlProvider
+    directory: ./config
+    escaped_semicolons: false
+zones:
+  example.com.:
+    sources:
+      - fastly
+    targets:
+      - config
+  example.net.:
+    sources:
+      - fastly
+    targets:
+      - config
+"""
+
+
+class WatchCmdTestCase(TestCase):
+    def setUp(self):
+        _shared_cache.clear()
+
+    def main(self, tmpdir, polls, *args):
+        config_file = join(tmpdir, "config.yaml")
+        with open(config_file, "w") as fh:
+            fh.write(CONFIG)
+        argv = [
+            "octodns-fastly-watch",
+            "--config-file",
+            config_file,
+            *args,
+            "fastly",
+        ]
+        # Stop watching once the polls have been made
+        sleeps = [None] * (len(polls) - 1) + [KeyboardInterrupt()]
+        mock_poll = MagicMock(side_effect=polls)
+        with patch("sys.argv", argv), patch(
+            "octodns.cmds.args.ArgumentParser._setup_logging"
+        ), patch("builtins.print") as mock_print, patch.object(
+            FastlyAcmeSource, "poll", mock_poll
+        ), patch(
+            "octodns_fastly.time.sleep", side_effect=sleeps
+        ) as mock_sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                main()
+        # Only the zones configured with the source are polled
+        assert [call(["example.com.", "example.net."])] * len(
+            polls
+        ) == mock_poll.call_args_list
+        return (
+            [json.loads(c.args[0]) for c in mock_print.call_args_list],
+            mock_sleep,
+        )
+
+    def test_watch(self):
+        one = {"example.com.": "1", "example.net.": "1"}
+        two = {"example.com.": "1", "example.net.": "2"}
+        with TemporaryDirectory() as tmpdir:
+            lines, mock_sleep = self.main(
+                tmpdir, [one, one, two, two], "--interval", "5"
+            )
+            assert [{"zones": ["example.net."]}] == lines
+            mock_sleep.assert_called_with(5.0)
+
+    def test_watch_with_fingerprints(self):
+        one = {"example.com.": "1", "example.net.": "1"}
+        two = {"example.com.": "2", "example.net.": "1"}
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "fingerprints.json")
+            # Without any fingerprints everything has changed
+            lines, _ = self.main(tmpdir, [one], "--fingerprints", path)
+            assert [{"zones": ["example.com.", "example.net."]}] == lines
+
+            source = FastlyAcmeSource("test_id", "test_token")
+            source.write_fingerprints(path, one)
+            lines, _ = self.main(tmpdir, [two, two], "--fingerprints", path)
+            assert [{"zones": ["example.com."]}] == lines
+            # The fingerprints are left for octodns-fastly-fingerprints to
+            # update once the zones have been synced, so a restarted watch
+            # reports the change again
+            assert one == source.read_fingerprints(path)
+            lines, _ = self.main(tmpdir, [two], "--fingerprints", path)
+            assert [{"zones": ["example.com."]}] == lines
+
+    def test_watch_dynamic_zones(self):
+        config = """
+providers:
+  fastly:
+    class: octodns_fastly.FastlyAcmeSource
+    token: test_token
+    zones:
+      - example.com.
+      - example.net.
+  config:
+    class: octodns.provider.yaml.YamlProvider
+    directory: ./config
+    escaped_semicolons: false
+zones:
+  '*':
+    sources:
+      - fastly
+    targets:
+      - config
+"""
+        com = _Challenge(
+            "managed-dns",
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+        net = com._replace(record_name="_acme-challenge.example.net")
+        with TemporaryDirectory() as tmpdir:
+            config_file = join(tmpdir, "config.yaml")
+            with open(config_file, "w") as fh:
+                fh.write(config)
+            argv = [
+                "octodns-fastly-watch",
+                "--config-file",
+                config_file,
+                "fastly",
+            ]
+            with patch("sys.argv", argv), patch(
+                "octodns.cmds.args.ArgumentParser._setup_logging"
+            ), patch("builtins.print") as mock_print, patch.object(
+                FastlyAcmeSource,
+                "_poll_challenges",
+                side_effect=[[com], [com, net]],
+            ), patch(
+                "octodns_fastly.time.sleep",
+                side_effect=[None, KeyboardInterrupt()],
+            ):
+                with self.assertRaises(KeyboardInterrupt):
+                    main()
+        # A zone without any challenges when watch started is still watched
+        mock_print.assert_called_once_with(
+            json.dumps({"zones": ["example.net."]}), flush=True
+        )
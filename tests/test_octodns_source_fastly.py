@@ -1,19 +1,330 @@
-from unittest import TestCase, skip
-from unittest.mock import MagicMock, call, patch
-
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir
+from os.path import join
+from sys import intern
+from tempfile import TemporaryDirectory
+from threading import Event
+from time import sleep
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import httpx
 from requests.exceptions import HTTPError
 
+from octodns.record import Record
 from octodns.zone import Zone
 
-from octodns_fastly import FastlyAcmeSource
+from octodns_fastly import (
+    FastlyAcmeAsyncSource,
+    FastlyAcmeMultiSource,
+    FastlyAcmeSource,
+    _Challenge,
+    _iter_json_object,
+    _Metrics,
+    _shared_cache,
+    _SharedCache,
+)
+
+
+def paged(*responses):
+    """
+    Build a `get` side effect that returns the response for the requested page,
+    regardless of the order the pages are requested in.
+    """
+
+    def get(url, params, headers):
+        return responses[params["page[number]"] - 1]
+
+    return get
+
+
+def challenges_page(*challenges, total_pages=1):
+    """
+    Build a page of a TLS subscriptions response with a challenge for each
+    `(record_name, value)`.
+    """
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.headers = {}
+    mock_response.json.return_value = {
+        "data": [],
+        "included": [
+            {
+                "id": f"authorization{i}",
+                "type": "tls_authorization",
+                "attributes": {
+                    "challenges": [
+                        {
+                            "type": "managed-dns",
+                            "record_type": "CNAME",
+                            "record_name": record_name,
+                            "values": [value],
+                        }
+                    ]
+                },
+            }
+            for i, (record_name, value) in enumerate(challenges)
+        ],
+        "meta": {"current_page": 1, "total_pages": total_pages},
+    }
+    return mock_response
+
+
+def challenge_page(record_name, value, etag=None, status_code=200):
+    """
+    Build a single page TLS subscriptions response with one challenge.
+    """
+    mock_response = MagicMock()
+    mock_response.status_code = status_code
+    mock_response.headers = {"ETag": etag} if etag else {}
+    mock_response.json.return_value = {
+        "data": [],
+        "included": [
+            {
+                "id": "1234567890abcdefghijkl",
+                "type": "tls_authorization",
+                "attributes": {
+                    "challenges": [
+                        {
+                            "type": "managed-dns",
+                            "record_type": "CNAME",
+                            "record_name": record_name,
+                            "values": [value],
+                        }
+                    ]
+                },
+            }
+        ],
+        "meta": {"current_page": 1, "total_pages": 1},
+    }
+    return mock_response
+
+
+class IterJsonObjectTestCase(TestCase):
+    def test_members(self):
+        text = json.dumps(
+            {
+                "data": [{"id": 1}, {"id": 2}],
+                "included": [],
+                "meta": {"current_page": 1, "total_pages": 12345},
+                "name": "caf\u00e9",
+                "total": 67890,
+            },
+            indent=2,
+        )
+        expected = [
+            ("data", {"id": 1}),
+            ("data", {"id": 2}),
+            ("meta", {"current_page": 1, "total_pages": 12345}),
+            ("name", "caf\u00e9"),
+            ("total", 67890),
+        ]
+
+        # All at once
+        assert expected == list(
+            _iter_json_object([text], streamed=("data", "included"))
+        )
+        # A character at a time, splitting every value and number, along with
+        # some empty chunks
+        chunks = [c for char in text for c in (char, "")]
+        assert expected == list(
+            _iter_json_object(chunks, streamed=("data", "included"))
+        )
+        # Arrays that aren't streamed are yielded whole
+        assert ("data", [{"id": 1}, {"id": 2}]) == next(
+            _iter_json_object([text])
+        )
+
+    def test_empty_object(self):
+        assert [] == list(_iter_json_object([" { ", " } "]))
+
+    def test_invalid(self):
+        # Truncated
+        with self.assertRaises(ValueError):
+            list(_iter_json_object(['{"meta": 1', ","]))
+        # Missing separator
+        with self.assertRaises(ValueError) as ctx:
+            list(_iter_json_object(['{"meta" 1}']))
+        assert "Expecting one of ':', found '1'" == str(ctx.exception)
+        # Invalid value
+        with self.assertRaises(json.JSONDecodeError):
+            list(_iter_json_object(['{"meta": nope}']))
+
+
+class SharedCacheTestCase(TestCase):
+    def test_eviction(self):
+        cache = _SharedCache(maxsize=2)
+        loads = []
+
+        def load(key):
+            loads.append(key)
+            return key.upper()
+
+        assert "A" == cache.get("a", lambda: load("a"))
+        assert "B" == cache.get("b", lambda: load("b"))
+        # Refresh a so that b is the least recently used
+        assert "A" == cache.get("a", lambda: load("a"))
+        assert "C" == cache.get("c", lambda: load("c"))
+        assert ["a", "b", "c"] == loads
+
+        assert "A" == cache.get("a", lambda: load("a"))
+        assert "B" == cache.get("b", lambda: load("b"))
+        assert ["a", "b", "c", "b"] == loads
+
+        cache.clear()
+        assert "A" == cache.get("a", lambda: load("a"))
+        assert ["a", "b", "c", "b", "a"] == loads
+
+    def test_single_in_flight_load(self):
+        cache = _SharedCache(maxsize=2)
+        loading = Event()
+        release = Event()
+        loads = []
+
+        def load():
+            loads.append(True)
+            loading.set()
+            release.wait(5)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(cache.get, "key", load)
+            loading.wait(5)
+            rest = [executor.submit(cache.get, "key", load) for _ in range(3)]
+            release.set()
+            results = [first.result()] + [f.result() for f in rest]
+
+        assert ["value"] * 4 == results
+        assert 1 == len(loads)
+
+    def test_failed_loads_are_not_cached(self):
+        cache = _SharedCache(maxsize=2)
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            cache.get("key", fail)
+        assert "value" == cache.get("key", lambda: "value")
+
+        # Cleared while loading
+        def clear_and_fail():
+            cache.clear()
+            cache.get("other", lambda: "other")
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            cache.get("key2", clear_and_fail)
+        assert "other" == cache.get("other", fail)
+
+    @patch("octodns_fastly.time.monotonic")
+    def test_max_age(self, mock_monotonic):
+        cache = _SharedCache(maxsize=2)
+        loads = []
+
+        def load():
+            loads.append(True)
+            return len(loads)
+
+        mock_monotonic.return_value = 100.0
+        assert 1 == cache.get("key", load, max_age=60)
+        mock_monotonic.return_value = 159.0
+        assert 1 == cache.get("key", load, max_age=60)
+        # Without a max age it's used however old it is
+        mock_monotonic.return_value = 1000.0
+        assert 1 == cache.get("key", load)
+        assert 2 == cache.get("key", load, max_age=60)
+        assert 2 == cache.get("key", load, max_age=60)
+
+
+class MetricsTestCase(TestCase):
+    def test_summary(self):
+        hook = MagicMock()
+        metrics = _Metrics(hook, {"source": "test_id"})
+        metrics.record("page.bytes", 1024, page=1)
+        metrics.record("page.bytes", 512, page=2)
+        metrics.timing("page.request", 0.25, page=1)
+        metrics.timing("page.request", 0.5, page=2)
+        with patch("octodns_fastly.time.perf_counter", side_effect=[1, 3]):
+            with metrics.timer("index.build"):
+                pass
+        metrics.record("cache.hit")
+
+        assert (
+            "cache.hit 1, index.build 1 in 2.000s, page.bytes 1536, "
+            "page.request 2 in 0.750s"
+        ) == metrics.summary()
+        hook.assert_has_calls(
+            [
+                call("page.bytes", 1024, {"source": "test_id", "page": 1}),
+                call("page.bytes", 512, {"source": "test_id", "page": 2}),
+                call("page.request", 0.25, {"source": "test_id", "page": 1}),
+                call("page.request", 0.5, {"source": "test_id", "page": 2}),
+                call("index.build", 2, {"source": "test_id"}),
+                call("cache.hit", 1, {"source": "test_id"}),
+            ]
+        )
+
+    def test_without_hook(self):
+        metrics = _Metrics()
+        assert "" == metrics.summary()
+        metrics.record("cache.miss")
+        assert "cache.miss 1" == metrics.summary()
 
 
 class FastlyAcmeSourceTestCase(TestCase):
+    def setUp(self):
+        # Every test starts from a fresh process' worth of state
+        _shared_cache.clear()
+
     def test_init(self):
         source = FastlyAcmeSource("test_id", "test_token")
         assert source.id == "test_id"
         assert source._ttl == 3600
         assert source._token == "test_token"
+        assert source._max_workers == 4
+
+    def test_custom_max_workers(self):
+        source = FastlyAcmeSource("test_id", "test_token", max_workers=16)
+        assert source._max_workers == 16
+        # The connection pool grows to match
+        assert (
+            source._session.get_adapter("https://api.fastly.com")._pool_maxsize
+            == 16
+        )
+
+    def test_session(self):
+        source = FastlyAcmeSource("test_id", "test_token")
+        adapter = source._session.get_adapter("https://api.fastly.com")
+        assert (10.0, 60.0) == adapter.timeout
+        assert 10 == adapter._pool_maxsize
+        assert "gzip" == source._session.headers["Accept-Encoding"]
+        assert "keep-alive" == source._session.headers["Connection"]
+
+        source = FastlyAcmeSource(
+            "test_id",
+            "test_token",
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            pool_size=3,
+            keep_alive=False,
+            compress=False,
+        )
+        adapter = source._session.get_adapter("https://api.fastly.com")
+        assert (1.0, 2.0) == adapter.timeout
+        assert 3 == adapter._pool_maxsize
+        assert "identity" == source._session.headers["Accept-Encoding"]
+        assert "close" == source._session.headers["Connection"]
+
+        # The timeout is applied to every request unless one is given
+        with patch("octodns_fastly.HTTPAdapter.send") as mock_send:
+            adapter.send("request")
+            mock_send.assert_called_once_with("request", timeout=(1.0, 2.0))
+            mock_send.reset_mock()
+            adapter.send("request", timeout=5)
+            mock_send.assert_called_once_with("request", timeout=5)
 
     @patch("octodns_fastly.requests")
     def test_custom_default_ttl(self, mock_requests):
@@ -57,30 +368,254 @@ class FastlyAcmeSourceTestCase(TestCase):
 
         assert 60 == records[("_acme-challenge", "CNAME")].ttl
 
-    @skip(reason="domain filter does not work when given a subzone")
     @patch("octodns_fastly.requests")
     def test_challanges_filters_by_zone(self, mock_requests):
-        zone = Zone("example.net.", [])
-        source = FastlyAcmeSource("test_id", "test_token")
+        # The full listing, a name per page
+        names = [
+            "example.net",
+            "www.example.net",
+            "internal.example.net",
+            "example.com",
+        ]
 
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "data": [],
-            "included": [],
-            "meta": {"total_pages": 1},
-        }
-        source._session = mock_requests
-        mock_requests.get.return_value = mock_response
+        def get(url, params, headers):
+            domain = params.get("filter[tls_domains.id]")
+            if domain is None:
+                name = names[params["page[number]"] - 1]
+            elif domain.lstrip("*.") in names:
+                name = domain.lstrip("*.")
+            else:
+                return challenges_page()
+            return challenges_page(
+                (f"_acme-challenge.{name}", f"{name}.fastly-validations.com"),
+                total_pages=len(names) if domain is None else 1,
+            )
+
+        mock_requests.get.side_effect = get
+
+        def populate(source, zone):
+            source.populate(zone)
+            return sorted((r.name, r.value) for r in zone.records)
 
-        source.populate(zone)
+        def filtered(*domains):
+            return [
+                call(
+                    "https://api.fastly.com/tls/subscriptions",
+                    params={
+                        "include": "tls_authorizations",
+                        "page[number]": 1,
+                        "filter[tls_domains.id]": domain,
+                    },
+                    headers={"Fastly-Key": "test_token"},
+                )
+                for domain in domains
+            ]
 
-        assert len(zone.records) == 0
-        mock_requests.get.assert_called_with(
-            "https://api.fastly.com/tls/subscriptions?include=tls_authorizations&filter[tls_domains.id]=example.net",
-            headers={"Fastly-Key": "test_token"},
+        expected = [
+            ("_acme-challenge", "example.net.fastly-validations.com."),
+            ("_acme-challenge.www", "www.example.net.fastly-validations.com."),
+        ]
+        with TemporaryDirectory() as cache_dir:
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                zone_filter_threshold=2,
+            )
+            source._session = mock_requests
+
+            # Without a full listing cached it's fetched instead
+            assert expected == populate(
+                source, Zone("example.net.", ["internal"])
+            )
+            assert 4 == mock_requests.get.call_count
+            assert all(
+                "filter[tls_domains.id]" not in c.kwargs["params"]
+                for c in mock_requests.get.call_args_list
+            )
+
+            # Once it's been indexed other zones aren't filtered either
+            mock_requests.get.reset_mock()
+            assert [
+                ("_acme-challenge", "example.com.fastly-validations.com.")
+            ] == populate(source, Zone("example.com.", []))
+            mock_requests.get.assert_not_called()
+
+            # Nor are they while the full listing cached on disk is fresh
+            _shared_cache.clear()
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                zone_filter_threshold=2,
+            )
+            source._session = mock_requests
+            assert expected == populate(
+                source, Zone("example.net.", ["internal"])
+            )
+            mock_requests.get.assert_not_called()
+
+            # Once it's stale, the zone's apex and the names below it, other
+            # than those in sub-zones, are filtered by
+            _shared_cache.clear()
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                cache_ttl=0,
+                zone_filter_threshold=2,
+            )
+            source._session = mock_requests
+            assert expected == populate(
+                source, Zone("example.net.", ["internal"])
+            )
+            self.assertCountEqual(
+                filtered(
+                    "example.net",
+                    "*.example.net",
+                    "www.example.net",
+                    "*.www.example.net",
+                ),
+                mock_requests.get.call_args_list,
+            )
+
+            # The subzone is filtered by its own name
+            mock_requests.get.reset_mock()
+            assert [
+                (
+                    "_acme-challenge",
+                    "internal.example.net.fastly-validations.com.",
+                )
+            ] == populate(source, Zone("internal.example.net.", []))
+            self.assertCountEqual(
+                filtered("internal.example.net", "*.internal.example.net"),
+                mock_requests.get.call_args_list,
+            )
+
+            # Zones that have already been filtered continue to be
+            mock_requests.get.reset_mock()
+            assert expected == populate(
+                source, Zone("example.net.", ["internal"])
+            )
+            mock_requests.get.assert_not_called()
+
+            # Past the threshold the full listing is used
+            assert [
+                ("_acme-challenge", "example.com.fastly-validations.com.")
+            ] == populate(source, Zone("example.com.", []))
+            assert 4 == mock_requests.get.call_count
+            assert all(
+                "filter[tls_domains.id]" not in c.kwargs["params"]
+                for c in mock_requests.get.call_args_list
+            )
+
+            # As it is when filtering would take more requests than it does
+            names.extend(
+                f"{label}example.org" for label in ("", "a.", "b.", "c.", "d.")
+            )
+            _shared_cache.clear()
+            source = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=cache_dir, cache_ttl=0
+            )
+            source._session = mock_requests
+            mock_requests.get.reset_mock()
+            populate(source, Zone("example.com.", []))
+            assert 9 == mock_requests.get.call_count
+            mock_requests.get.reset_mock()
+            _shared_cache.clear()
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                cache_ttl=0,
+                zone_filter_threshold=2,
+            )
+            source._session = mock_requests
+            assert 5 == len(populate(source, Zone("example.org.", [])))
+            assert 9 == mock_requests.get.call_count
+            assert all(
+                "filter[tls_domains.id]" not in c.kwargs["params"]
+                for c in mock_requests.get.call_args_list
+            )
+
+            # Or when the full listing is older than full_refresh_interval
+            _shared_cache.clear()
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                cache_ttl=0,
+                full_refresh_interval=0,
+                zone_filter_threshold=2,
+            )
+            source._session = mock_requests
+            mock_requests.get.reset_mock()
+            assert expected == populate(
+                source, Zone("example.net.", ["internal"])
+            )
+            assert 9 == mock_requests.get.call_count
+            assert all(
+                "filter[tls_domains.id]" not in c.kwargs["params"]
+                for c in mock_requests.get.call_args_list
+            )
+
+    def test_requires_token_or_snapshot(self):
+        with self.assertRaises(ValueError) as ctx:
+            FastlyAcmeSource("test_id")
+        assert "FastlyAcmeSource requires a token or a snapshot" == str(
+            ctx.exception
         )
 
+    def test_zone_filter_threshold_requires_cache_dir(self):
+        with self.assertRaises(ValueError) as ctx:
+            FastlyAcmeSource("test_id", "test_token", zone_filter_threshold=1)
+        assert "zone_filter_threshold requires cache_dir" == str(ctx.exception)
+
+    @patch("octodns_fastly.requests")
+    def test_filtered_listings_are_not_cached_on_disk(self, mock_requests):
+        with TemporaryDirectory() as cache_dir:
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                zone_filter_threshold=1,
+            )
+            source._session = mock_requests
+            mock_requests.get.side_effect = lambda url, params, headers: (
+                challenges_page(
+                    (
+                        "_acme-challenge.example.com",
+                        "1234567890abcdef.fastly-validations.com",
+                    ),
+                    total_pages=2,
+                )
+            )
+
+            # The full listing is cached, for the next run to filter with
+            source.populate(Zone("example.com.", []))
+            (name,) = listdir(cache_dir)
+            with open(join(cache_dir, name)) as fh:
+                cached = fh.read()
+
+            _shared_cache.clear()
+            mock_requests.get.reset_mock()
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                cache_ttl=0,
+                zone_filter_threshold=1,
+            )
+            source._session = mock_requests
+            source.populate(Zone("example.com.", []))
+            assert all(
+                "filter[tls_domains.id]" in c.kwargs["params"]
+                for c in mock_requests.get.call_args_list
+            )
+            assert [name] == listdir(cache_dir)
+            with open(join(cache_dir, name)) as fh:
+                assert cached == fh.read()
+
     @patch("octodns_fastly.requests")
     def test_populate_filters_non_tls_authorizations(self, mock_requests):
         zone = Zone("example.com.", [])
@@ -422,6 +957,36 @@ class FastlyAcmeSourceTestCase(TestCase):
         assert "1234567890abcdef.fastly-validations.com." == record.value
         assert 3600 == record.ttl
 
+    def test_populate_skips_subzone_records_before_building_them(self):
+        source = FastlyAcmeSource("test_id", "test_token")
+        source._list_tls_authorizations = lambda domain: tuple(
+            _Challenge(
+                "managed-dns",
+                record_name,
+                "1234567890abcdef.fastly-validations.com",
+            )
+            for record_name in (
+                "_acme-challenge.example.com",
+                "_acme-challenge.www.internal.example.com",
+                "_acme-challenge.other.example.com",
+            )
+        )
+
+        zone = Zone("example.com.", ["internal", "_acme-challenge.other"])
+        with patch("octodns_fastly.Record.new", wraps=Record.new) as new:
+            source.populate(zone)
+        assert ["_acme-challenge"] == [r.name for r in zone.records]
+        new.assert_called_once()
+
+        # When lenient they're added, with a warning from the zone
+        zone = Zone("example.com.", ["internal", "_acme-challenge.other"])
+        source.populate(zone, lenient=True)
+        assert [
+            "_acme-challenge",
+            "_acme-challenge.other",
+            "_acme-challenge.www.internal",
+        ] == sorted(r.name for r in zone.records)
+
     # The TLS subscription list API endpoint is paginated.
     @patch("octodns_fastly.requests")
     def test_populate_supports_api_pagination(self, mock_requests):
@@ -504,11 +1069,11 @@ class FastlyAcmeSourceTestCase(TestCase):
         }
 
         source._session = mock_requests
-        mock_requests.get.side_effect = [
+        mock_requests.get.side_effect = paged(
             mock_page_one_response,
             mock_page_two_response,
             mock_page_three_response,
-        ]
+        )
 
         source.populate(zone)
 
@@ -533,7 +1098,9 @@ class FastlyAcmeSourceTestCase(TestCase):
                     params={"include": "tls_authorizations", "page[number]": 3},
                     headers={"Fastly-Key": "test_token"},
                 ),
-            ]
+            ],
+            # Pages after the first are fetched concurrently
+            any_order=True,
         )
 
         record = records[("_acme-challenge", "CNAME")]
@@ -611,10 +1178,9 @@ class FastlyAcmeSourceTestCase(TestCase):
             "meta": {"current_page": 2, "total_pages": 2},
         }
         source._session = mock_requests
-        mock_requests.get.side_effect = [
-            mock_page_one_response,
-            mock_page_two_response,
-        ]
+        mock_requests.get.side_effect = paged(
+            mock_page_one_response, mock_page_two_response
+        )
 
         source.populate(zone)
 
@@ -628,6 +1194,1402 @@ class FastlyAcmeSourceTestCase(TestCase):
         assert "1234567890abcdef.fastly-validations.com." == record.value
         assert 3600 == record.ttl
 
+    @patch("octodns_fastly.requests")
+    def test_list_tls_authorizations_merges_pages_in_order(self, mock_requests):
+        source = FastlyAcmeSource("test_id", "test_token", max_workers=3)
+
+        def get(url, params, headers):
+            number = params["page[number]"]
+            # Make earlier pages finish last
+            sleep((4 - number) * 0.01)
+            mock_response = MagicMock()
+            mock_response.json.return_value = {
+                "data": [],
+                "included": [
+                    {
+                        "id": f"authorization-{number}",
+                        "type": "tls_authorization",
+                        "attributes": {
+                            "challenges": [
+                                {
+                                    "type": "managed-dns",
+                                    "record_type": "CNAME",
+                                    "record_name": f"_acme-challenge.www{number}.example.com",
+                                    "values": [
+                                        f"{number}.fastly-validations.com"
+                                    ],
+                                }
+                            ]
+                        },
+                    }
+                ],
+                "meta": {"current_page": number, "total_pages": 4},
+            }
+            return mock_response
+
+        source._session = mock_requests
+        mock_requests.get.side_effect = get
+
+        challenges = source._list_tls_authorizations()
+
+        assert [
+            "_acme-challenge.www1.example.com",
+            "_acme-challenge.www2.example.com",
+            "_acme-challenge.www3.example.com",
+            "_acme-challenge.www4.example.com",
+        ] == [challenge.record_name for challenge in challenges]
+        assert 4 == mock_requests.get.call_count
+
+    @patch("octodns_fastly.requests")
+    def test_challenge_index(self, mock_requests):
+        source = FastlyAcmeSource("test_id", "test_token")
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "data": [],
+            "included": [
+                {
+                    "id": "1234567890abcdefghijkl",
+                    "type": "tls_authorization",
+                    "attributes": {
+                        "challenges": [
+                            {
+                                "type": "managed-dns",
+                                "record_type": "CNAME",
+                                "record_name": "_acme-challenge.www.example.com",
+                                "values": [
+                                    "1234567890abcdef.fastly-validations.com"
+                                ],
+                            },
+                            {
+                                "type": "managed-http-cname",
+                                "record_type": "CNAME",
+                                "record_name": "www.example.com",
+                                "values": ["j.sni.global.fastly.net"],
+                            },
+                            {
+                                "type": "managed-dns",
+                                "record_type": "CNAME",
+                                "record_name": "_acme-challenge.example.net",
+                                "values": [
+                                    "fedcba0987654321.fastly-validations.com"
+                                ],
+                            },
+                        ]
+                    },
+                }
+            ],
+            "meta": {"current_page": 1, "total_pages": 1},
+        }
+        source._session = mock_requests
+        mock_requests.get.return_value = mock_response
+
+        index = source._challenge_index()
+
+        assert {
+            "www.example.com.": [
+                ("_acme-challenge", "1234567890abcdef.fastly-validations.com.")
+            ],
+            "example.com.": [
+                (
+                    "_acme-challenge.www",
+                    "1234567890abcdef.fastly-validations.com.",
+                )
+            ],
+            "example.net.": [
+                ("_acme-challenge", "fedcba0987654321.fastly-validations.com.")
+            ],
+            "com.": [
+                (
+                    "_acme-challenge.www.example",
+                    "1234567890abcdef.fastly-validations.com.",
+                )
+            ],
+            "net.": [
+                (
+                    "_acme-challenge.example",
+                    "fedcba0987654321.fastly-validations.com.",
+                )
+            ],
+        } == index
+
+        # Populating several zones only builds the index once
+        for name in ("example.com.", "example.net.", "example.org."):
+            source.populate(Zone(name, []))
+        assert index is source._challenge_index()
+        assert 1 == mock_requests.get.call_count
+
+    @patch("octodns_fastly.requests")
+    def test_cache_is_written_and_reused_while_fresh(self, mock_requests):
+        with TemporaryDirectory() as cache_dir:
+            source = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=join(cache_dir, "fastly")
+            )
+            source._session = mock_requests
+            mock_requests.get.return_value = challenge_page(
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+                etag='"abc"',
+            )
+
+            zone = Zone("example.com.", [])
+            source.populate(zone)
+            assert 1 == len(zone.records)
+
+            # The token never ends up on disk
+            filenames = listdir(join(cache_dir, "fastly"))
+            assert 1 == len(filenames)
+            assert "test_token" not in filenames[0]
+            with open(join(cache_dir, "fastly", filenames[0])) as fh:
+                cache = json.load(fh)
+            assert [
+                {
+                    "etag": '"abc"',
+                    "total_pages": 1,
+                    "challenges": [
+                        [
+                            "managed-dns",
+                            "_acme-challenge.example.com",
+                            "1234567890abcdef.fastly-validations.com",
+                        ]
+                    ],
+                }
+            ] == cache["pages"]
+
+            # A new source in the next octodns-sync run uses the cache
+            _shared_cache.clear()
+            other = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=join(cache_dir, "fastly")
+            )
+            other_requests = MagicMock()
+            other._session = other_requests
+
+            zone = Zone("example.com.", [])
+            other.populate(zone)
+            other_requests.get.assert_not_called()
+
+            records = {(r.name, r._type): r for r in zone.records}
+            record = records[("_acme-challenge", "CNAME")]
+            assert "1234567890abcdef.fastly-validations.com." == record.value
+
+    @patch("octodns_fastly.requests")
+    def test_cache_is_revalidated_when_stale(self, mock_requests):
+        with TemporaryDirectory() as cache_dir:
+            source = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=cache_dir
+            )
+            source._session = mock_requests
+            mock_requests.get.return_value = challenge_page(
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+                etag='"abc"',
+            )
+            source._list_tls_authorizations()
+
+            # Not modified, the cached page is used
+            _shared_cache.clear()
+            stale = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=cache_dir, cache_ttl=0
+            )
+            stale_requests = MagicMock()
+            stale._session = stale_requests
+            stale_requests.get.return_value.status_code = 304
+
+            zone = Zone("example.com.", [])
+            stale.populate(zone)
+            stale_requests.get.assert_called_once_with(
+                "https://api.fastly.com/tls/subscriptions",
+                params={"include": "tls_authorizations", "page[number]": 1},
+                headers={"Fastly-Key": "test_token", "If-None-Match": '"abc"'},
+            )
+            records = {(r.name, r._type): r for r in zone.records}
+            record = records[("_acme-challenge", "CNAME")]
+            assert "1234567890abcdef.fastly-validations.com." == record.value
+
+            # Modified, and without an ETag this time
+            _shared_cache.clear()
+            stale = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=cache_dir, cache_ttl=0
+            )
+            stale_requests = MagicMock()
+            stale._session = stale_requests
+            stale_requests.get.return_value = challenge_page(
+                "_acme-challenge.example.com",
+                "fedcba0987654321.fastly-validations.com",
+            )
+
+            zone = Zone("example.com.", [])
+            stale.populate(zone)
+            records = {(r.name, r._type): r for r in zone.records}
+            record = records[("_acme-challenge", "CNAME")]
+            assert "fedcba0987654321.fastly-validations.com." == record.value
+
+            # Without an ETag the next revalidation is unconditional
+            _shared_cache.clear()
+            stale = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=cache_dir, cache_ttl=0
+            )
+            stale_requests = MagicMock()
+            stale._session = stale_requests
+            stale_requests.get.return_value = challenge_page(
+                "_acme-challenge.example.com",
+                "fedcba0987654321.fastly-validations.com",
+            )
+            stale._list_tls_authorizations()
+            stale_requests.get.assert_called_once_with(
+                "https://api.fastly.com/tls/subscriptions",
+                params={"include": "tls_authorizations", "page[number]": 1},
+                headers={"Fastly-Key": "test_token"},
+            )
+
+    @patch("octodns_fastly.requests")
+    def test_metrics(self, mock_requests):
+        def metrics(source, hook):
+            names = [c.args[0] for c in hook.call_args_list]
+            tags = [c.args[2] for c in hook.call_args_list]
+            assert all(t["source"] == "test_id" for t in tags)
+            return names
+
+        with TemporaryDirectory() as cache_dir:
+            hook = MagicMock()
+            source = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=cache_dir, metrics=hook
+            )
+            source._session = mock_requests
+            mock_requests.get.return_value = challenge_page(
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+                etag='"abc"',
+            )
+            source.populate(Zone("example.com.", []))
+            assert [
+                "cache.miss",
+                "page.request",
+                "page.bytes",
+                "page.decode",
+                "index.build",
+                "zone.populate",
+            ] == metrics(source, hook)
+            assert {"source": "test_id", "page": 1, "status": 200} == (
+                hook.call_args_list[1].args[2]
+            )
+            assert {"source": "test_id", "zone": "example.com."} == (
+                hook.call_args_list[-1].args[2]
+            )
+
+            # Stale and revalidated
+            _shared_cache.clear()
+            hook = MagicMock()
+            stale = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                cache_ttl=0,
+                metrics=hook,
+            )
+            stale._session = MagicMock()
+            stale._session.get.return_value.status_code = 304
+            stale._list_tls_authorizations()
+            assert [
+                "cache.stale",
+                "page.request",
+                "page.not_modified",
+            ] == metrics(stale, hook)
+
+            # Fresh
+            _shared_cache.clear()
+            hook = MagicMock()
+            fresh = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=cache_dir, metrics=hook
+            )
+            fresh._list_tls_authorizations()
+            assert ["cache.hit"] == metrics(fresh, hook)
+            assert "cache.hit 1" == fresh._metrics.summary()
+
+    def test_metrics_hook_path(self):
+        source = FastlyAcmeSource(
+            "test_id", "test_token", metrics="os.path.join"
+        )
+        assert join is source._metrics._hook
+
+    def test_incremental_refresh(self):
+        def page(number, total_pages, name=None):
+            record_name = (
+                f"_acme-challenge.{name or f'www{number}'}.example.com"
+            )
+            mock_response = challenge_page(
+                record_name,
+                f"{number}.fastly-validations.com",
+                etag=json.dumps([record_name, total_pages]),
+            )
+            body = mock_response.json.return_value
+            body["meta"] = {"current_page": number, "total_pages": total_pages}
+            return mock_response
+
+        def source(cache_dir, responses, **kwargs):
+            _shared_cache.clear()
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                cache_dir=cache_dir,
+                cache_ttl=0,
+                incremental=True,
+                **kwargs,
+            )
+
+            def get(url, params, headers):
+                resp = responses[params["page[number]"]]
+                if headers.get("If-None-Match") == resp.headers["ETag"]:
+                    return MagicMock(status_code=304)
+                return resp
+
+            source._session = MagicMock()
+            source._session.get.side_effect = get
+            return source
+
+        def requested_pages(source):
+            return [
+                (
+                    c.kwargs["params"]["page[number]"],
+                    "If-None-Match" in c.kwargs["headers"],
+                )
+                for c in source._session.get.call_args_list
+            ]
+
+        def record_names(source):
+            zone = Zone("example.com.", [])
+            source.populate(zone)
+            return sorted(r.name for r in zone.records)
+
+        with TemporaryDirectory() as cache_dir:
+            # The first run fetches everything
+            first = source(cache_dir, {1: page(1, 2), 2: page(2, 2)})
+            assert ["_acme-challenge.www1", "_acme-challenge.www2"] == (
+                record_names(first)
+            )
+            assert [(1, False), (2, False)] == requested_pages(first)
+            assert "created_at" == first._params["sort"]
+
+            # Every cached page is revalidated at once, so changes to existing
+            # subscriptions, e.g. a renewal, before the last page are seen
+            renewed = {1: page(1, 2, "renewed"), 2: page(2, 2)}
+            second = source(cache_dir, renewed)
+            assert ["_acme-challenge.renewed", "_acme-challenge.www2"] == (
+                record_names(second)
+            )
+            assert [(1, True), (2, True)] == sorted(requested_pages(second))
+            assert 1 == second._metrics._counts["page.not_modified"]
+
+            # New pages after the cached ones are fetched once they have been
+            # revalidated
+            grown = {1: page(1, 3, "renewed"), 2: page(2, 3), 3: page(3, 3)}
+            third = source(cache_dir, grown)
+            assert [
+                "_acme-challenge.renewed",
+                "_acme-challenge.www2",
+                "_acme-challenge.www3",
+            ] == record_names(third)
+            requested = requested_pages(third)
+            assert [(1, True), (2, True)] == sorted(requested[:2])
+            assert [(3, False)] == requested[2:]
+
+            # Subscriptions were deleted and there are fewer pages, so
+            # everything is fetched again
+            shrunk = {
+                1: page(1, 2, "renewed"),
+                2: page(2, 2, "www3"),
+                3: page(3, 2, "gone"),
+            }
+            fourth = source(cache_dir, shrunk)
+            assert ["_acme-challenge.renewed", "_acme-challenge.www3"] == (
+                record_names(fourth)
+            )
+            requested = requested_pages(fourth)
+            assert [(1, True), (2, True), (3, True)] == sorted(requested[:3])
+            assert [(1, True), (2, True)] == requested[3:]
+
+    def test_incremental_requires_cache_dir(self):
+        with self.assertRaises(ValueError) as ctx:
+            FastlyAcmeSource("test_id", "test_token", incremental=True)
+        assert "incremental requires cache_dir" == str(ctx.exception)
+
+    @patch("octodns_fastly.requests")
+    def test_cache_is_ignored_when_unusable(self, mock_requests):
+        with TemporaryDirectory() as cache_dir:
+            source = FastlyAcmeSource(
+                "test_id", "test_token", cache_dir=cache_dir
+            )
+            source._session = mock_requests
+            mock_requests.get.return_value = challenge_page(
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+            )
+
+            with open(source._cache_path(), "w") as fh:
+                fh.write("{not json")
+            assert source._read_cache() is None
+
+            with open(source._cache_path(), "w") as fh:
+                json.dump({"version": 0, "fetched_at": 0, "pages": []}, fh)
+            assert source._read_cache() is None
+
+            # The unusable cache is replaced after fetching
+            source._list_tls_authorizations()
+            mock_requests.get.assert_called_once()
+            assert source._read_cache() is not None
+
+    @patch("octodns_fastly.requests")
+    def test_page_size_and_sparse_fieldsets(self, mock_requests):
+        source = FastlyAcmeSource(
+            "test_id", "test_token", page_size=100, sparse_fieldsets=True
+        )
+        source._session = mock_requests
+        mock_requests.get.return_value = challenge_page(
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+
+        assert 1 == len(zone.records)
+        mock_requests.get.assert_called_once_with(
+            "https://api.fastly.com/tls/subscriptions",
+            params={
+                "include": "tls_authorizations",
+                "page[number]": 1,
+                "page[size]": 100,
+                "fields[tls_subscription]": "tls_authorizations",
+                "fields[tls_authorization]": "challenges",
+            },
+            headers={"Fastly-Key": "test_token"},
+        )
+
+        # Pages of a different size are cached separately
+        with TemporaryDirectory() as cache_dir:
+            paths = {
+                FastlyAcmeSource(
+                    "test_id", "test_token", cache_dir=cache_dir, **kwargs
+                )._cache_path()
+                for kwargs in ({}, {"page_size": 100}, {"page_size": 20})
+            }
+            assert 3 == len(paths)
+
+    @patch("octodns_fastly.requests")
+    def test_populate_streams_pages(self, mock_requests):
+        zone = Zone("example.com.", [])
+        source = FastlyAcmeSource("test_id", "test_token", stream=True)
+
+        body = challenge_page(
+            "_acme-challenge.www.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        ).json.return_value
+        body["data"] = [{"id": "caf\u00e9", "type": "tls_subscription"}]
+        body["included"].append({"id": "1234", "type": "tls_other"})
+        content = json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        # Small chunks split the multi-byte character
+        mock_response.iter_content.return_value = [
+            content[i : i + 3] for i in range(0, len(content), 3)
+        ]
+        source._session = mock_requests
+        mock_requests.get.return_value = mock_response
+
+        source.populate(zone)
+
+        records = {(r.name, r._type): r for r in zone.records}
+        assert 1 == len(records)
+        record = records[("_acme-challenge.www", "CNAME")]
+        assert "1234567890abcdef.fastly-validations.com." == record.value
+
+        mock_requests.get.assert_called_once_with(
+            "https://api.fastly.com/tls/subscriptions",
+            params={"include": "tls_authorizations", "page[number]": 1},
+            headers={"Fastly-Key": "test_token"},
+            stream=True,
+        )
+        mock_response.json.assert_not_called()
+        mock_response.iter_content.assert_called_once_with(
+            chunk_size=FastlyAcmeSource.STREAM_CHUNK_SIZE
+        )
+        mock_response.close.assert_called_once()
+        assert f"page.bytes {len(content)}" in source._metrics.summary()
+
+    def test_challenges_are_compact(self):
+        challenges = list(
+            _Challenge.parse(
+                {
+                    "id": "1234567890abcdefghijkl",
+                    "type": "tls_authorization",
+                    "attributes": {
+                        "challenges": [
+                            {
+                                "type": "managed-dns",
+                                "record_type": "CNAME",
+                                "record_name": "_acme-challenge.example.com",
+                                "values": [
+                                    "1234567890abcdef.fastly-validations.com"
+                                ],
+                            },
+                            {
+                                "type": "managed-http-a",
+                                "record_type": "A",
+                                "record_name": "example.com",
+                                "values": [],
+                            },
+                        ],
+                        "created_at": "2023-01-01T00:00:00.000Z",
+                    },
+                }
+            )
+        )
+
+        assert [
+            (
+                "managed-dns",
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+            ),
+            ("managed-http-a", "example.com", ""),
+        ] == challenges
+        assert not hasattr(challenges[0], "__dict__")
+        # Strings are interned so duplicates across authorizations are shared
+        assert challenges[0].type is intern("managed-dns")
+
+    @patch("octodns_fastly.uniform")
+    @patch("octodns_fastly.time")
+    def test_retry_delay(self, mock_time, mock_uniform):
+        mock_time.time.return_value = 1700000000.0
+        mock_uniform.side_effect = lambda low, high: high
+        source = FastlyAcmeSource(
+            "test_id", "test_token", max_retries=3, retry_max_backoff=3.0
+        )
+
+        def delay(status_code, attempt=0, **headers):
+            resp = MagicMock()
+            resp.status_code = status_code
+            resp.headers = headers
+            return source._retry_delay(resp, 1, attempt)
+
+        # Not worth retrying
+        assert delay(200) is None
+        assert delay(401) is None
+        # Out of retries
+        assert delay(503, attempt=3) is None
+
+        # Jittered exponential backoff, capped
+        assert 1.0 == delay(503)
+        assert 2.0 == delay(502, attempt=1)
+        assert 3.0 == delay(500, attempt=2)
+        mock_uniform.assert_called_with(0, 3.0)
+
+        # Server provided delays are capped too
+        assert 3.0 == delay(429, **{"Retry-After": "7"})
+        assert 3.0 == delay(
+            429,
+            **{
+                "Fastly-RateLimit-Remaining": "0",
+                "Fastly-RateLimit-Reset": "1700000042",
+            },
+        )
+
+        source = FastlyAcmeSource("test_id", "test_token", max_retries=3)
+
+        # Retry-After in seconds or as a date
+        assert 7.0 == delay(429, **{"Retry-After": "7"})
+        assert 30.0 == delay(
+            429, **{"Retry-After": "Tue, 14 Nov 2023 22:13:50 GMT"}
+        )
+        # Dates in the past don't wait
+        assert 0.0 == delay(
+            429, **{"Retry-After": "Tue, 14 Nov 2023 22:00:00 GMT"}
+        )
+        # Invalid values fall back to backoff
+        assert 1.0 == delay(429, **{"Retry-After": "soon"})
+
+        # Until the rate limit resets
+        assert 42.0 == delay(
+            429,
+            **{
+                "Fastly-RateLimit-Remaining": "0",
+                "Fastly-RateLimit-Reset": "1700000042",
+            },
+        )
+        assert 1.0 == delay(429, **{"Fastly-RateLimit-Remaining": "0"})
+        assert 1.0 == delay(
+            429,
+            **{
+                "Fastly-RateLimit-Remaining": "0",
+                "Fastly-RateLimit-Reset": "soon",
+            },
+        )
+        assert 1.0 == delay(429, **{"Fastly-RateLimit-Remaining": "10"})
+
+    @patch("octodns_fastly.time.sleep")
+    @patch("octodns_fastly.requests")
+    def test_populate_retries_failed_pages(self, mock_requests, mock_sleep):
+        zone = Zone("example.com.", [])
+        source = FastlyAcmeSource("test_id", "test_token")
+
+        page_one = challenge_page(
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+        page_one.json.return_value["meta"]["total_pages"] = 2
+        page_two = challenge_page(
+            "_acme-challenge.www.example.com",
+            "fedcba0987654321.fastly-validations.com",
+        )
+        page_two.json.return_value["meta"]["current_page"] = 2
+        rate_limited = MagicMock()
+        rate_limited.status_code = 429
+        rate_limited.headers = {"Retry-After": "2"}
+        unavailable = MagicMock()
+        unavailable.status_code = 503
+        unavailable.headers = {"Retry-After": "1"}
+
+        responses = {1: [page_one], 2: [rate_limited, unavailable, page_two]}
+
+        def get(url, params, headers):
+            return responses[params["page[number]"]].pop(0)
+
+        source._session = mock_requests
+        mock_requests.get.side_effect = get
+
+        source.populate(zone)
+
+        assert 2 == len(zone.records)
+        # The first page isn't refetched when the second fails
+        assert 4 == mock_requests.get.call_count
+        mock_sleep.assert_has_calls([call(2.0), call(1.0)])
+        rate_limited.close.assert_called_once()
+        assert "page.retry 2" in source._metrics.summary()
+
+    @patch("octodns_fastly.time.sleep")
+    @patch("octodns_fastly.requests")
+    def test_populate_errors_once_out_of_retries(
+        self, mock_requests, mock_sleep
+    ):
+        zone = Zone("example.com.", [])
+        source = FastlyAcmeSource("test_id", "test_token", max_retries=2)
+
+        mock_response = MagicMock()
+        mock_response.status_code = 503
+        mock_response.headers = {}
+        mock_response.raise_for_status.side_effect = HTTPError()
+        source._session = mock_requests
+        mock_requests.get.return_value = mock_response
+
+        with self.assertRaises(HTTPError):
+            source.populate(zone)
+
+        assert 3 == mock_requests.get.call_count
+        assert 2 == mock_sleep.call_count
+
+    @patch("octodns_fastly.requests")
+    def test_sources_share_account_fetches(self, mock_requests):
+        mock_requests.get.return_value = challenge_page(
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+
+        sources = [
+            FastlyAcmeSource("fastly-short", "test_token", default_ttl=60),
+            FastlyAcmeSource("fastly-long", "test_token", default_ttl=7200),
+            FastlyAcmeSource("fastly-other", "other_token"),
+        ]
+        for source in sources:
+            source._session = mock_requests
+
+        zones = [Zone("example.com.", []) for _ in sources]
+        for source, zone in zip(sources, zones):
+            source.populate(zone)
+
+        # One fetch per token
+        assert 2 == mock_requests.get.call_count
+        assert [60, 7200, 3600] == [list(zone.records)[0].ttl for zone in zones]
+
+        # Until they're older than cache_ttl
+        source = FastlyAcmeSource("fastly-later", "test_token", cache_ttl=0)
+        source._session = mock_requests
+        source.populate(Zone("example.com.", []))
+        assert 3 == mock_requests.get.call_count
+
+    def test_populate_filters_by_subscription_state(self):
+        def authorization(id, name):
+            return {
+                "id": id,
+                "type": "tls_authorization",
+                "attributes": {
+                    "challenges": [
+                        {
+                            "type": "managed-dns",
+                            "record_type": "CNAME",
+                            "record_name": f"_acme-challenge.{name}.example.com",
+                            "values": [f"{id}.fastly-validations.com"],
+                        }
+                    ]
+                },
+            }
+
+        def subscription(id, state, authorization_ids):
+            return {
+                "id": id,
+                "type": "tls_subscription",
+                "attributes": {"state": state},
+                "relationships": {
+                    "tls_authorizations": {
+                        "data": [
+                            {
+                                "id": authorization_id,
+                                "type": "tls_authorization",
+                            }
+                            for authorization_id in authorization_ids
+                        ]
+                    }
+                },
+            }
+
+        # The included authorizations come before the subscriptions
+        body = {
+            "included": [
+                authorization("a1", "issued"),
+                authorization("a2", "pending"),
+                authorization("a3", "processing"),
+            ],
+            "data": [
+                subscription("s1", "issued", ["a1"]),
+                subscription("s2", "pending", ["a2"]),
+                subscription("s3", "processing", ["a3"]),
+            ],
+            "meta": {"current_page": 1, "total_pages": 1},
+        }
+
+        for stream in (False, True):
+            _shared_cache.clear()
+            source = FastlyAcmeSource(
+                "test_id",
+                "test_token",
+                stream=stream,
+                sparse_fieldsets=True,
+                subscription_states=["pending", "processing"],
+            )
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.headers = {}
+            mock_response.json.return_value = body
+            mock_response.iter_content.return_value = [
+                json.dumps(body).encode()
+            ]
+            source._session = MagicMock()
+            source._session.get.return_value = mock_response
+
+            zone = Zone("example.com.", [])
+            source.populate(zone)
+
+            assert [
+                "_acme-challenge.pending",
+                "_acme-challenge.processing",
+            ] == (sorted(r.name for r in zone.records))
+            params = source._session.get.call_args[1]["params"]
+            assert "state,tls_authorizations" == (
+                params["fields[tls_subscription]"]
+            )
+
+        # Sources with different states don't share their challenges
+        keys = {
+            FastlyAcmeSource(
+                "test_id", "test_token", subscription_states=states
+            )._cache_key()
+            for states in (None, ["pending"], ["pending", "issued"])
+        }
+        assert 3 == len(keys)
+
+    @patch("octodns_fastly.requests")
+    def test_prefetch(self, mock_requests):
+        source = FastlyAcmeSource("test_id", "test_token")
+        source._session = mock_requests
+        mock_requests.get.return_value = challenge_page(
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+
+        source.prefetch()
+        mock_requests.get.assert_called_once()
+
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+        assert 1 == len(zone.records)
+        # Nothing more was fetched
+        mock_requests.get.assert_called_once()
+
+    @patch("octodns_fastly.requests")
+    def test_prefetch_in_background(self, mock_requests):
+        started = Event()
+        release = Event()
+
+        def get(url, params, headers):
+            started.set()
+            release.wait()
+            return challenge_page(
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+            )
+
+        session = mock_requests.Session.return_value
+        session.get.side_effect = get
+        source = FastlyAcmeSource("test_id", "test_token", prefetch=True)
+        assert started.wait(timeout=5)
+
+        # populate waits for the prefetch to finish rather than fetching
+        zone = Zone("example.com.", [])
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            populated = executor.submit(source.populate, zone)
+            sleep(0.05)
+            assert not populated.done()
+            release.set()
+            populated.result(timeout=5)
+        source._prefetch_thread.join(timeout=5)
+
+        assert 1 == len(zone.records)
+        session.get.assert_called_once()
+
+    @patch("octodns_fastly.requests")
+    def test_prefetch_in_background_failure(self, mock_requests):
+        session = mock_requests.Session.return_value
+        session.get.side_effect = [
+            HTTPError("Service Unavailable"),
+            challenge_page(
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+            ),
+        ]
+        with self.assertLogs("FastlyAcmeSource[test_id]", "WARNING") as logs:
+            source = FastlyAcmeSource("test_id", "test_token", prefetch=True)
+            source._prefetch_thread.join(timeout=5)
+        assert "prefetch failed" in logs.output[0]
+
+        # The failure wasn't kept, populate fetches again
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+        assert 1 == len(zone.records)
+        assert 2 == session.get.call_count
+
+    @patch("octodns_fastly.requests")
+    def test_snapshot(self, mock_requests):
+        source = FastlyAcmeSource("test_id", "test_token")
+        source._session = mock_requests
+        mock_requests.get.return_value = challenge_page(
+            "_acme-challenge.www.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+
+        with TemporaryDirectory() as tmpdir:
+            for name in ("snapshot.json", "snapshot.json.gz"):
+                path = join(tmpdir, name)
+                assert 1 == source.write_snapshot(path)
+
+                # No token, and every zone is populated from the snapshot
+                loaded = FastlyAcmeSource(
+                    "test_id",
+                    snapshot=path,
+                    cache_dir=tmpdir,
+                    zone_filter_threshold=10,
+                )
+                zone = Zone("example.com.", [])
+                loaded.populate(zone)
+                records = {(r.name, r._type): r for r in zone.records}
+                record = records[("_acme-challenge.www", "CNAME")]
+                assert "1234567890abcdef.fastly-validations.com." == (
+                    record.value
+                )
+                assert (
+                    source._list_tls_authorizations()
+                    == loaded._list_tls_authorizations()
+                )
+            # Only the first fetch went to Fastly
+            mock_requests.get.assert_called_once()
+            assert ["snapshot.json", "snapshot.json.gz"] == sorted(
+                listdir(tmpdir)
+            )
+
+            with open(join(tmpdir, "snapshot.json")) as fh:
+                snapshot = json.load(fh)
+            assert [
+                [
+                    "managed-dns",
+                    "_acme-challenge.www.example.com",
+                    "1234567890abcdef.fastly-validations.com",
+                ]
+            ] == snapshot["challenges"]
+
+            path = join(tmpdir, "old.json")
+            with open(path, "w") as fh:
+                json.dump({"version": 0, "challenges": []}, fh)
+            _shared_cache.clear()
+            with self.assertRaises(ValueError) as ctx:
+                FastlyAcmeSource(
+                    "test_id", snapshot=path
+                )._list_tls_authorizations()
+            assert "Unsupported snapshot version 0" in str(ctx.exception)
+
+    @patch("octodns_fastly.requests")
+    def test_zones(self, mock_requests):
+        page = challenge_page(
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+        challenges = page.json.return_value["included"][0]["attributes"][
+            "challenges"
+        ]
+        for record_name in (
+            "_acme-challenge.www.example.com",
+            "_acme-challenge.example.org",
+            "_acme-challenge.www.example.net",
+        ):
+            challenges.append(
+                {
+                    "type": "managed-dns",
+                    "record_type": "CNAME",
+                    "record_name": record_name,
+                    "values": ["fedcba0987654321.fastly-validations.com"],
+                }
+            )
+        mock_requests.get.return_value = page
+
+        source = FastlyAcmeSource(
+            "test_id", "test_token", zones=["example.com.", "example.net"]
+        )
+        source._session = mock_requests
+
+        # Challenges outside of the zones are discarded as they're received
+        assert [
+            "_acme-challenge.example.com",
+            "_acme-challenge.www.example.com",
+            "_acme-challenge.www.example.net",
+        ] == [c.record_name for c in source._list_tls_authorizations()]
+        # and only the zones are indexed
+        assert ["example.com.", "example.net."] == sorted(
+            source._challenge_index()
+        )
+
+        zone = Zone("example.net.", [])
+        source.populate(zone)
+        assert ["_acme-challenge.www"] == [r.name for r in zone.records]
+
+        zone = Zone("example.org.", [])
+        with self.assertLogs("FastlyAcmeSource[test_id]", "WARNING"):
+            source.populate(zone)
+        assert 0 == len(zone.records)
+
+        # Sources with other zones don't share the listing
+        other = FastlyAcmeSource(
+            "test_id", "test_token", zones=["example.org."]
+        )
+        other._session = mock_requests
+        assert ["_acme-challenge.example.org"] == [
+            c.record_name for c in other._list_tls_authorizations()
+        ]
+        assert 2 == mock_requests.get.call_count
+
+        # Snapshots are filtered as they're loaded
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "snapshot.json")
+            unfiltered = FastlyAcmeSource("test_id", "test_token")
+            unfiltered._session = mock_requests
+            unfiltered.write_snapshot(path)
+            loaded = FastlyAcmeSource(
+                "test_id", snapshot=path, zones=["example.org."]
+            )
+            assert ["_acme-challenge.example.org"] == [
+                c.record_name for c in loaded._list_tls_authorizations()
+            ]
+
+    @patch("octodns_fastly.requests")
+    def test_domains_endpoint(self, mock_requests):
+        page = challenge_page(
+            "_acme-challenge.www.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+        page.json.return_value["data"] = [
+            {
+                "id": "www.example.com",
+                "type": "tls_domain",
+                "relationships": {
+                    "tls_authorizations": {
+                        "data": [
+                            {
+                                "id": "1234567890abcdefghijkl",
+                                "type": "tls_authorization",
+                            }
+                        ]
+                    }
+                },
+            }
+        ]
+        mock_requests.get.return_value = page
+
+        source = FastlyAcmeSource(
+            "test_id", "test_token", endpoint="domains", sparse_fieldsets=True
+        )
+        source._session = mock_requests
+
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+        records = {(r.name, r._type): r for r in zone.records}
+        record = records[("_acme-challenge.www", "CNAME")]
+        assert "1234567890abcdef.fastly-validations.com." == record.value
+
+        mock_requests.get.assert_called_once_with(
+            "https://api.fastly.com/tls/domains",
+            params={
+                "include": "tls_authorizations",
+                "fields[tls_domain]": "tls_authorizations",
+                "fields[tls_authorization]": "challenges",
+                "page[number]": 1,
+            },
+            headers={"Fastly-Key": "test_token"},
+        )
+        # The listing isn't shared with the subscriptions one
+        assert (
+            FastlyAcmeSource("test_id", "test_token")._cache_key()
+            != FastlyAcmeSource(
+                "test_id", "test_token", endpoint="domains"
+            )._cache_key()
+        )
+
+        with self.assertRaises(ValueError) as ctx:
+            FastlyAcmeSource("test_id", "test_token", endpoint="other")
+        assert "Unknown endpoint other" in str(ctx.exception)
+        for kwargs in (
+            {"subscription_states": ["issued"]},
+            {"incremental": True},
+            # TLS domains can't be filtered by name
+            {"zone_filter_threshold": 10},
+        ):
+            with self.assertRaises(ValueError):
+                FastlyAcmeSource(
+                    "test_id",
+                    "test_token",
+                    endpoint="domains",
+                    cache_dir="./cache",
+                    **kwargs,
+                )
+
+    def test_msgspec_decoder(self):
+        def authorization(id, record_name):
+            return {
+                "id": id,
+                "type": "tls_authorization",
+                "attributes": {
+                    "challenges": [
+                        {
+                            "type": "managed-dns",
+                            "record_type": "CNAME",
+                            "record_name": record_name,
+                            "values": [
+                                "1234567890abcdef.fastly-validations.com"
+                            ],
+                        },
+                        {
+                            "type": "managed-http-a",
+                            "record_type": "A",
+                            "record_name": record_name,
+                            "values": [],
+                        },
+                    ],
+                    "state": "pending",
+                },
+            }
+
+        body = {
+            "data": [
+                {
+                    "id": f"sub{i}",
+                    "type": "tls_subscription",
+                    "attributes": {"state": state},
+                    "relationships": {
+                        "tls_authorizations": {
+                            "data": [
+                                {"id": f"auth{i}", "type": "tls_authorization"}
+                            ]
+                        }
+                    },
+                }
+                for i, state in enumerate(("issued", "pending"))
+            ],
+            "included": [
+                authorization("auth0", "_acme-challenge.example.com"),
+                authorization("auth1", "_acme-challenge.www.example.net"),
+                {"id": "1234", "type": "tls_other"},
+            ],
+            "links": {},
+            "meta": {"current_page": 1, "per_page": 20, "total_pages": 1},
+        }
+
+        def response():
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.headers = {}
+            mock_response.json.return_value = body
+            mock_response.content = json.dumps(body).encode()
+            return mock_response
+
+        # Decodes to the same challenges as the json decoder
+        for kwargs in (
+            {},
+            {"subscription_states": ["issued"]},
+            {"zones": ["example.net."]},
+        ):
+            _shared_cache.clear()
+            typed = FastlyAcmeSource(
+                "test_id", "test_token", decoder="msgspec", **kwargs
+            )
+            typed._session = MagicMock()
+            typed._session.get.return_value = response()
+            typed_challenges = typed._list_tls_authorizations()
+            typed._session.get.return_value.json.assert_not_called()
+
+            _shared_cache.clear()
+            source = FastlyAcmeSource("test_id", "test_token", **kwargs)
+            source._session = MagicMock()
+            source._session.get.return_value = response()
+            assert source._list_tls_authorizations() == typed_challenges
+            assert typed_challenges
+
+        typed = FastlyAcmeSource("test_id", "test_token", decoder="msgspec")
+        page = typed._decode_page(
+            b'{"data": [], "meta": {"current_page": 2, "total_pages": 3}}'
+        )
+        assert (
+            {"current_page": 2, "total_pages": 3},
+            [],
+        ) == typed._parse_typed_page(page)
+
+        # The shape is validated as it's decoded
+        with self.assertRaises(ValueError):
+            typed._decode_page(b'{"data": [], "meta": {"current_page": 1}}')
+
+    def test_decoder_option(self):
+        assert FastlyAcmeSource("test_id", "test_token")._decode_page is None
+        assert FastlyAcmeSource(
+            "test_id", "test_token", decoder="auto"
+        )._decode_page
+
+        with patch.dict(
+            "sys.modules", {"msgspec": None, "octodns_fastly._typed": None}
+        ):
+            assert (
+                FastlyAcmeSource(
+                    "test_id", "test_token", decoder="auto"
+                )._decode_page
+                is None
+            )
+            with self.assertRaises(ImportError) as ctx:
+                FastlyAcmeSource("test_id", "test_token", decoder="msgspec")
+            assert "octodns-fastly[fast]" in str(ctx.exception)
+
+        with self.assertRaises(ValueError) as ctx:
+            FastlyAcmeSource("test_id", "test_token", decoder="other")
+        assert "Unknown decoder other" in str(ctx.exception)
+
+    def test_list_zones(self):
+        def challenges(domain):
+            return tuple(
+                _Challenge(
+                    "managed-dns",
+                    record_name,
+                    "1234567890abcdef.fastly-validations.com",
+                )
+                for record_name in (
+                    "_acme-challenge.example.com",
+                    "_acme-challenge.www.example.com",
+                    "_acme-challenge.deep.sub.example.net",
+                    "_acme-challenge.www.other.com",
+                )
+            ) + (
+                _Challenge("managed-http-a", "example.org", "1.2.3.4"),
+            )
+
+        # Names certificates were requested for aren't necessarily zones
+        source = FastlyAcmeSource("test_id", "test_token")
+        source._list_tls_authorizations = challenges
+        with self.assertRaises(ValueError) as ctx:
+            source.list_zones()
+        assert "list_zones requires zones to be configured" == str(
+            ctx.exception
+        )
+
+        # Only the configured zones that have challenges
+        source = FastlyAcmeSource(
+            "test_id",
+            "test_token",
+            zones=["example.net.", "example.org.", "other.com."],
+        )
+        source._list_tls_authorizations = challenges
+        assert ["example.net.", "other.com."] == source.list_zones()
+
+    def test_fingerprints(self):
+        zone_names = ["example.com.", "www.example.com.", "example.net."]
+
+        def source(*record_names, default_ttl=3600, zones=zone_names):
+            source = FastlyAcmeSource(
+                "test_id", "test_token", default_ttl=default_ttl, zones=zones
+            )
+            source._list_tls_authorizations = lambda domain: tuple(
+                _Challenge("managed-dns", record_name, value)
+                for record_name, value in record_names
+            )
+            return source
+
+        one = ("_acme-challenge.example.com", "1.fastly-validations.com")
+        two = ("_acme-challenge.www.example.com", "2.fastly-validations.com")
+        three = ("_acme-challenge.example.net", "3.fastly-validations.com")
+
+        # Only the zones, including those without any challenges
+        fingerprints = source(one, two).zone_fingerprints()
+        assert sorted(zone_names) == sorted(fingerprints)
+        # Stable regardless of the order, or duplication, of challenges
+        assert fingerprints == source(two, one, two).zone_fingerprints()
+        # and changes with the ttl
+        assert (
+            fingerprints != source(one, two, default_ttl=60).zone_fingerprints()
+        )
+        # Given zone names, e.g. from the octoDNS config, rather than zones
+        assert fingerprints == source(one, two, zones=None).zone_fingerprints(
+            zone_names
+        )
+        with self.assertRaises(ValueError) as ctx:
+            source(one, two, zones=None).zone_fingerprints()
+        assert "zone names are required" in str(ctx.exception)
+
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "fingerprints.json")
+            # Everything has changed when there aren't any fingerprints yet
+            assert sorted(zone_names) == source(one, two).changed_zones(path)
+
+            source(one, two).write_fingerprints(path)
+            assert [] == source(one, two).changed_zones(path)
+            assert fingerprints == source(one).read_fingerprints(path)
+
+            # Given fingerprints are written, and compared, as-is
+            other = join(tmpdir, "other.json")
+            source(one).write_fingerprints(other, fingerprints)
+            assert fingerprints == source(one).read_fingerprints(other)
+            assert [] == source(one).changed_zones(path, fingerprints)
+
+            # Changed, gained their first and lost their last challenge. The
+            # sub-zone's challenges are only in its own fingerprint
+            changed = (
+                "_acme-challenge.www.example.com",
+                "4.fastly-validations.com",
+            )
+            assert ["example.net.", "www.example.com."] == source(
+                one, changed, three
+            ).changed_zones(path)
+            assert ["www.example.com."] == source(one).changed_zones(path)
+
+            with open(path, "w") as fh:
+                json.dump({"version": 0, "fingerprints": {}}, fh)
+            with self.assertRaises(ValueError) as ctx:
+                source(one).changed_zones(path)
+            assert "Unsupported fingerprints version 0" in str(ctx.exception)
+
+    def test_poll(self):
+        zones = ["example.com.", "example.net."]
+        source = FastlyAcmeSource("test_id", "test_token", zones=zones)
+        source._session = MagicMock()
+        source._session.get.return_value = challenge_page(
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+            etag='"abc"',
+        )
+        fingerprints = source.poll()
+        assert zones == sorted(fingerprints)
+        assert ["example.org."] == list(source.poll(["example.org."]))
+
+        # Unchanged pages are revalidated
+        source._session.get.reset_mock()
+        source._session.get.return_value = MagicMock(status_code=304)
+        assert fingerprints == source.poll()
+        source._session.get.assert_called_once_with(
+            "https://api.fastly.com/tls/subscriptions",
+            params={"include": "tls_authorizations", "page[number]": 1},
+            headers={"Fastly-Key": "test_token", "If-None-Match": '"abc"'},
+        )
+
+        source._session.get.return_value = challenge_page(
+            "_acme-challenge.example.com",
+            "fedcba0987654321.fastly-validations.com",
+        )
+        changed = source.poll()
+        assert fingerprints.keys() == changed.keys()
+        assert fingerprints["example.com."] != changed["example.com."]
+
+        # Polling and populating fetch independently
+        source._session.get.return_value = challenge_page(
+            "_acme-challenge.example.net",
+            "1234567890abcdef.fastly-validations.com",
+        )
+        zone = Zone("example.net.", [])
+        source.populate(zone)
+        assert 1 == len(zone.records)
+        assert fingerprints["example.net."] != source.poll()["example.net."]
+
+        # Snapshots are read again
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "snapshot.json")
+            source.write_snapshot(path)
+            loaded = FastlyAcmeSource("test_id", snapshot=path, zones=zones)
+            assert source.poll() == loaded.poll()
+
+    @patch("octodns_fastly.time.sleep")
+    def test_watch(self, mock_sleep):
+        source = FastlyAcmeSource(
+            "test_id",
+            "test_token",
+            zones=["example.com.", "example.net.", "example.org."],
+        )
+        one = {"example.com.": "1", "example.net.": "1"}
+        two = {"example.com.": "2", "example.org.": "1"}
+        source.poll = MagicMock(
+            side_effect=[one, HTTPError("Service Unavailable"), one, two]
+        )
+        callback = MagicMock()
+
+        with self.assertLogs("FastlyAcmeSource[test_id]", "WARNING"):
+            source.watch(callback, interval=5, polls=4)
+        callback.assert_called_once_with(
+            ["example.com.", "example.net.", "example.org."], two
+        )
+        mock_sleep.assert_has_calls([call(5)] * 3)
+        assert 3 == mock_sleep.call_count
+
+        # Compared against previous fingerprints from the first poll
+        callback.reset_mock()
+        source.poll = MagicMock(return_value=one)
+        source.watch(callback, previous=one, polls=1, zone_names=["a.com."])
+        callback.assert_not_called()
+        source.poll.assert_called_once_with(["a.com."])
+        source.watch(callback, previous=two, polls=1)
+        callback.assert_called_once_with(
+            ["example.com.", "example.net.", "example.org."], one
+        )
+
+        # Without any zones to poll it fails up front, rather than every poll
+        source = FastlyAcmeSource("test_id", "test_token")
+        source.poll = MagicMock()
+        with self.assertRaises(ValueError) as ctx:
+            source.watch(callback)
+        assert "zone names are required when zones aren't configured" == str(
+            ctx.exception
+        )
+        source.poll.assert_not_called()
+
     @patch("octodns_fastly.requests")
     def test_populate_errors_with_invalid_api_key(self, mock_requests):
         zone = Zone("example.com.", [])
@@ -645,3 +2607,387 @@ class FastlyAcmeSourceTestCase(TestCase):
 
         with self.assertRaises(HTTPError):
             source.populate(zone)
+
+
+class FastlyAcmeAsyncSourceTestCase(TestCase):
+    def setUp(self):
+        _shared_cache.clear()
+
+    def source(self, handler, **kwargs):
+        source = FastlyAcmeAsyncSource("test_id", "test_token", **kwargs)
+        source._async_client = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        return source
+
+    def test_init(self):
+        source = FastlyAcmeAsyncSource(
+            "test_id",
+            "test_token",
+            max_workers=2,
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            pool_size=3,
+            compress=False,
+        )
+        assert source.id == "test_id"
+        assert source._max_workers == 2
+        client = source._async_client()
+        assert isinstance(client, httpx.AsyncClient)
+        assert httpx.Timeout(2.0, connect=1.0) == client.timeout
+        assert "identity" == client.headers["Accept-Encoding"]
+
+        with self.assertRaises(ValueError):
+            FastlyAcmeAsyncSource("test_id", "test_token", stream=True)
+
+        with patch.dict("sys.modules", {"httpx": None}):
+            with self.assertRaises(ImportError) as ctx:
+                FastlyAcmeAsyncSource("test_id", "test_token")
+            assert "octodns-fastly[async]" in str(ctx.exception)
+
+    def test_populate(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            number = int(request.url.params["page[number]"])
+            assert "test_token" == request.headers["Fastly-Key"]
+            return httpx.Response(
+                200,
+                json={
+                    "data": [],
+                    "included": [
+                        {
+                            "id": f"authorization-{number}",
+                            "type": "tls_authorization",
+                            "attributes": {
+                                "challenges": [
+                                    {
+                                        "type": "managed-dns",
+                                        "record_type": "CNAME",
+                                        "record_name": f"_acme-challenge.www{number}.example.com",
+                                        "values": [
+                                            f"{number}.fastly-validations.com"
+                                        ],
+                                    }
+                                ]
+                            },
+                        }
+                    ],
+                    "meta": {"current_page": number, "total_pages": 5},
+                },
+            )
+
+        source = self.source(handler, max_workers=2)
+
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+
+        assert 5 == len(requests)
+        assert [
+            f"_acme-challenge.www{number}.example.com" for number in range(1, 6)
+        ] == [
+            challenge.record_name
+            for challenge in source._list_tls_authorizations()
+        ]
+
+        records = {(r.name, r._type): r for r in zone.records}
+        assert 5 == len(records)
+        record = records[("_acme-challenge.www3", "CNAME")]
+        assert "3.fastly-validations.com." == record.value
+
+    def test_populate_revalidates_cache(self):
+        def handler(request):
+            if request.headers.get("If-None-Match") == '"abc"':
+                return httpx.Response(304)
+            return httpx.Response(
+                200,
+                headers={"ETag": '"abc"'},
+                json=challenge_page(
+                    "_acme-challenge.example.com",
+                    "1234567890abcdef.fastly-validations.com",
+                ).json.return_value,
+            )
+
+        with TemporaryDirectory() as cache_dir:
+            self.source(handler, cache_dir=cache_dir)._list_tls_authorizations()
+
+            _shared_cache.clear()
+            source = self.source(handler, cache_dir=cache_dir, cache_ttl=0)
+            zone = Zone("example.com.", [])
+            source.populate(zone)
+
+            records = {(r.name, r._type): r for r in zone.records}
+            record = records[("_acme-challenge", "CNAME")]
+            assert "1234567890abcdef.fastly-validations.com." == record.value
+
+    @patch("octodns_fastly.asyncio.sleep", new_callable=AsyncMock)
+    def test_populate_retries_failed_pages(self, mock_sleep):
+        statuses = [429, 200]
+
+        def handler(request):
+            status_code = statuses.pop(0)
+            if status_code != 200:
+                return httpx.Response(status_code, headers={"Retry-After": "3"})
+            return httpx.Response(
+                200,
+                json=challenge_page(
+                    "_acme-challenge.example.com",
+                    "1234567890abcdef.fastly-validations.com",
+                ).json.return_value,
+            )
+
+        source = self.source(handler)
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+
+        assert 1 == len(zone.records)
+        mock_sleep.assert_awaited_once_with(3.0)
+
+    def test_populate_from_async_code(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(
+                200,
+                json=challenge_page(
+                    "_acme-challenge.example.com",
+                    "1234567890abcdef.fastly-validations.com",
+                ).json.return_value,
+            )
+
+        async def populate(source):
+            zone = Zone("example.com.", [])
+            source.populate(zone)
+            return zone
+
+        zone = asyncio.run(populate(self.source(handler)))
+        records = {(r.name, r._type): r for r in zone.records}
+        record = records[("_acme-challenge", "CNAME")]
+        assert "1234567890abcdef.fastly-validations.com." == record.value
+        assert 1 == len(requests)
+
+        # Prefetching alongside other async work
+        _shared_cache.clear()
+        source = self.source(handler)
+
+        async def prefetch():
+            return await asyncio.gather(
+                source.aprefetch(), asyncio.sleep(0, "other")
+            )
+
+        assert [None, "other"] == asyncio.run(prefetch())
+        assert 2 == len(requests)
+        zone = asyncio.run(populate(source))
+        assert 1 == len(zone.records)
+        assert 2 == len(requests)
+
+    def test_prefetch_in_background(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(
+                200,
+                json=challenge_page(
+                    "_acme-challenge.example.com",
+                    "1234567890abcdef.fastly-validations.com",
+                ).json.return_value,
+            )
+
+        with patch.object(
+            FastlyAcmeAsyncSource,
+            "_async_client",
+            lambda self: httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ),
+        ):
+            source = FastlyAcmeAsyncSource(
+                "test_id", "test_token", prefetch=True
+            )
+            source._prefetch_thread.join(timeout=5)
+
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+        assert 1 == len(zone.records)
+        assert 1 == len(requests)
+
+    def test_populate_errors_with_invalid_api_key(self):
+        def handler(request):
+            return httpx.Response(
+                401, json={"msg": "Provided credentials are missing or invalid"}
+            )
+
+        source = self.source(handler)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            source.populate(Zone("example.com.", []))
+
+
+class FastlyAcmeMultiSourceTestCase(TestCase):
+    def setUp(self):
+        _shared_cache.clear()
+
+    def test_init(self):
+        source = FastlyAcmeMultiSource(
+            "test_id", {"production": "token_1", "staging": "token_2"}
+        )
+        assert ["production", "staging"] == list(source._accounts)
+        assert "token_1" == source._accounts["production"]._token
+        assert "test_id[staging]" == source._accounts["staging"].id
+
+        source = FastlyAcmeMultiSource(
+            "test_id", ["token_1", "token_2"], default_ttl=60, max_workers=2
+        )
+        assert ["0", "1"] == list(source._accounts)
+        assert "token_2" == source._accounts["1"]._token
+        assert 60 == source._ttl
+        assert 2 == source._accounts["0"]._max_workers
+
+        with self.assertRaises(ValueError):
+            FastlyAcmeMultiSource("test_id", [])
+
+        with self.assertRaises(ValueError) as ctx:
+            FastlyAcmeMultiSource(
+                "test_id",
+                ["token_1"],
+                cache_dir="./cache",
+                zone_filter_threshold=2,
+            )
+        assert (
+            "FastlyAcmeMultiSource doesn't support zone_filter_threshold"
+            == str(ctx.exception)
+        )
+
+        # env/ references in a list are resolved
+        with patch.dict("os.environ", {"FASTLY_A": "token_a"}):
+            source = FastlyAcmeMultiSource(
+                "test_id", ["env/FASTLY_A", "token_2"]
+            )
+            assert "token_a" == source._accounts["0"]._token
+            assert "token_2" == source._accounts["1"]._token
+
+            with self.assertRaises(ValueError) as ctx:
+                FastlyAcmeMultiSource("test_id", ["env/FASTLY_B"])
+            assert "missing env var FASTLY_B" in str(ctx.exception)
+
+    def test_populate(self):
+        source = FastlyAcmeMultiSource(
+            "test_id", {"production": "token_1", "staging": "token_2"}
+        )
+
+        production = MagicMock()
+        production.get.return_value = challenge_page(
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+        source._accounts["production"]._session = production
+        staging = MagicMock()
+        staging.get.return_value = challenge_page(
+            "_acme-challenge.www.example.com",
+            "fedcba0987654321.fastly-validations.com",
+        )
+        source._accounts["staging"]._session = staging
+
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+
+        records = {(r.name, r._type): r for r in zone.records}
+        assert 2 == len(records)
+        record = records[("_acme-challenge", "CNAME")]
+        assert "1234567890abcdef.fastly-validations.com." == record.value
+        record = records[("_acme-challenge.www", "CNAME")]
+        assert "fedcba0987654321.fastly-validations.com." == record.value
+
+        production.get.assert_called_once()
+        assert {"Fastly-Key": "token_1"} == production.get.call_args[1][
+            "headers"
+        ]
+        staging.get.assert_called_once()
+        assert {"Fastly-Key": "token_2"} == staging.get.call_args[1]["headers"]
+
+        assert ["production", "staging"] == sorted(source.account_timings)
+
+    @patch("octodns_fastly.requests")
+    def test_prefetch_in_background(self, mock_requests):
+        session = mock_requests.Session.return_value
+        session.get.return_value = challenge_page(
+            "_acme-challenge.example.com",
+            "1234567890abcdef.fastly-validations.com",
+        )
+        source = FastlyAcmeMultiSource(
+            "test_id", ["token_1", "token_2"], prefetch=True
+        )
+        source._prefetch_thread.join(timeout=5)
+        # Only the multi-source prefetches, fetching each account once
+        for account in source._accounts.values():
+            assert not hasattr(account, "_prefetch_thread")
+        assert 2 == session.get.call_count
+
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+        assert 1 == len(zone.records)
+        assert 2 == session.get.call_count
+
+    def test_snapshot(self):
+        source = FastlyAcmeMultiSource("test_id", ["token_1", "token_2"])
+        for i, account in enumerate(source._accounts.values()):
+            account._session = MagicMock()
+            account._session.get.return_value = challenge_page(
+                f"_acme-challenge.www{i}.example.com",
+                "1234567890abcdef.fastly-validations.com",
+            )
+
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "snapshot.json.gz")
+            assert 2 == source.write_snapshot(path)
+
+            # The snapshot already has every account's challenges
+            _shared_cache.clear()
+            loaded = FastlyAcmeMultiSource(
+                "test_id", ["token_1", "token_2"], snapshot=path
+            )
+            zone = Zone("example.com.", [])
+            loaded.populate(zone)
+            assert 2 == len(zone.records)
+            assert {} == loaded.account_timings
+
+    def test_poll(self):
+        zones = ["example0.com.", "example1.com."]
+        source = FastlyAcmeMultiSource(
+            "test_id", ["token_1", "token_2"], zones=zones
+        )
+        for i, account in enumerate(source._accounts.values()):
+            account._session = MagicMock()
+            account._session.get.return_value = challenge_page(
+                f"_acme-challenge.example{i}.com",
+                "1234567890abcdef.fastly-validations.com",
+            )
+        # Every account's challenges
+        fingerprints = source.poll()
+        assert fingerprints == source.zone_fingerprints()
+        empty = source._fingerprint_index({})
+        assert all(fingerprints[zone] != empty[zone] for zone in zones)
+
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, "snapshot.json")
+            source.write_snapshot(path)
+            loaded = FastlyAcmeMultiSource(
+                "test_id", ["token_1", "token_2"], snapshot=path, zones=zones
+            )
+            assert fingerprints == loaded.poll()
+
+    def test_populate_dedups_across_accounts(self):
+        source = FastlyAcmeMultiSource("test_id", ["token_1", "token_2"])
+        for account in source._accounts.values():
+            account._session = MagicMock()
+            account._session.get.return_value = challenge_page(
+                "_acme-challenge.example.com",
+                "1234567890abcdef.fastly-validations.com",
+            )
+
+        zone = Zone("example.com.", [])
+        source.populate(zone)
+
+        assert 1 == len(zone.records)